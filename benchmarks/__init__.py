@@ -0,0 +1,10 @@
+"""
+Benchmarks for the Flask application.
+
+The scripts in this folder have to be run from the folder that contains the
+'programming_languages' folder, e.g.:
+your_name@[your_path/flask_test_project]$python -m benchmarks.startup
+
+suite.py measures all routes at once and compares the results with the
+stored baseline.json (see its docstring).
+"""
@@ -0,0 +1,69 @@
+"""
+Benchmark of the counters of the charts (see aggregates.py).
+
+For lists of synthetic developer names (a few developers with many
+languages, many with one), the script compares:
+- the original counting with list.count() per unique name (only for the
+  small size, as it takes quadratic time),
+- counting all rows in one pass, and
+- the query of the chart ("count >= 4") from the heap against sorting all
+  counts.
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.aggregates
+"""
+
+import random
+import timeit
+
+from programming_languages.myflaskapp.aggregates import CounterHeap
+
+SIZES = [10 ** 4, 10 ** 6]
+THRESHOLD = 4
+
+
+def synthetic_developers(number, seed=0):
+    """Return number developer names with a long-tailed distribution."""
+    rng = random.Random(seed)
+    # two thirds of the rows belong to a developer of their own
+    return ["developer " + str(number + int(rng.paretovariate(0.8)))
+            if i % 3 == 0 else "developer " + str(i)
+            for i in range(number)]
+
+
+def measure(function):
+    """Return the best time per call in ms."""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=number)) / number * 1000
+
+
+def sorted_at_least(counts, threshold):
+    """Query without the heap: sort all counts and filter them."""
+    return [(key, count) for key, count in
+            sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+            if count >= threshold]
+
+
+def main():
+    for size in SIZES:
+        developers = synthetic_developers(size)
+        print("{} rows, {} developers:".format(size, len(set(developers))))
+        if size <= 10 ** 4:
+            ms = measure(lambda: {developer: developers.count(developer)
+                                  for developer in set(developers)})
+            print("  list.count per name:        {:10.3f} ms".format(ms))
+        ms = measure(lambda: CounterHeap(developers))
+        print("  one pass with the heap:     {:10.3f} ms".format(ms))
+
+        counter = CounterHeap(developers)
+        assert counter.at_least(THRESHOLD) == \
+            sorted_at_least(counter.counts, THRESHOLD)
+        ms = measure(lambda: sorted_at_least(counter.counts, THRESHOLD))
+        print("  query, sorting all counts:  {:10.3f} ms".format(ms))
+        ms = measure(lambda: counter.at_least(THRESHOLD))
+        print("  query from the heap:        {:10.3f} ms ({} entries)"
+              .format(ms, len(counter.at_least(THRESHOLD))))
+
+
+if __name__ == "__main__":
+    main()
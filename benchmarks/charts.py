@@ -0,0 +1,32 @@
+"""
+Microbenchmark of the interactive chart on the '/charts' page.
+
+Compares the cost per request of building and serializing the plotly figure
+(as it was done before on every request) with a lookup in the chart cache.
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.charts
+"""
+
+import timeit
+
+from programming_languages.myflaskapp import create_app
+
+
+def measure(function):
+    """Return the best time per call in ms."""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=number)) / number * 1000
+
+
+def main():
+    snapshot = create_app().extensions["snapshot_reloader"].current
+    chart_cache = snapshot.chart_cache
+    before = measure(chart_cache.renderers["new-languages"])
+    after = measure(lambda: chart_cache.get("new-languages"))
+    print("per request, rendered: {:.3f} ms".format(before))
+    print("per request, cached:   {:.6f} ms".format(after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Cold start benchmark of the app.
+
+Each scenario runs in a fresh Python process with 'python -X importtime'. It
+creates the app and sends a first request to one route. The script prints
+the time to the first response and the import times of the heavy libraries
+that were imported on the way.
+see: https://docs.python.org/3/using/cmdline.html#cmdoption-X
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.cold_start
+"""
+
+import subprocess
+import sys
+
+# routes of the first request (None = only create the app)
+SCENARIOS = [None, "/about", "/api/languages", "/charts/developers.svg",
+             "/api/charts/new-languages.json"]
+LIBRARIES = ["flask", "numpy", "sqlalchemy", "pandas", "matplotlib",
+             "plotly.express"]
+
+SCRIPT = """
+import time
+start = time.perf_counter()
+from programming_languages.myflaskapp import create_app
+app = create_app()
+created = time.perf_counter()
+if {route!r} is not None:
+    assert app.test_client().get({route!r}).status_code == 200
+print(created - start, time.perf_counter() - start)
+"""
+
+
+def import_times(stderr):
+    """Return the cumulative import times in ms of the top-level packages."""
+    times = {}
+    for line in stderr.splitlines():
+        # format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        if name in LIBRARIES and cumulative.strip().isdigit():
+            times[name] = int(cumulative) / 1000
+    return times
+
+
+def main():
+    for route in SCENARIOS:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c",
+             SCRIPT.format(route=route)],
+            capture_output=True, text=True, check=True)
+        created, first_response = map(float, result.stdout.split()[-2:])
+        times = import_times(result.stderr)
+        print("{:<32} create_app: {:6.0f} ms, first response: {:6.0f} ms"
+              .format(str(route), created * 1000, first_response * 1000))
+        print("    imports: " + ", ".join(
+            "{} {:.0f} ms".format(name, ms) for name, ms in times.items()))
+
+
+if __name__ == "__main__":
+    main()
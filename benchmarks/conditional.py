@@ -0,0 +1,48 @@
+"""
+Benchmark of the conditional GET requests of the pages.
+
+Measures requests per second through the Flask test client for first visits
+(page rendered), first visits with the page in the response cache, and
+repeat visits of a browser that sends the ETag of its cached copy (304).
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.conditional
+"""
+
+import time
+
+from programming_languages.myflaskapp import create_app
+
+PAGES = ["/about", "/table", "/relationships?language=Python", "/charts"]
+DURATION = 1.0
+
+
+def requests_per_second(client, url, headers=None, page_cache=None):
+    """Return the number of requests per second for the url."""
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < DURATION:
+        if page_cache is not None:
+            page_cache.clear()
+        client.get(url, headers=headers)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    app = create_app()
+    client = app.test_client()
+    print("{:<32} {:>10} {:>10} {:>10}".format("req/s", "rendered",
+                                               "cached", "304"))
+    for url in PAGES:
+        etag = client.get(url).headers["ETag"]
+        rendered = requests_per_second(
+            client, url, page_cache=app.extensions["page_cache"])
+        cached = requests_per_second(client, url)
+        revalidated = requests_per_second(client, url,
+                                          headers={"If-None-Match": etag})
+        print("{:<32} {:>10.0f} {:>10.0f} {:>10.0f}".format(
+            url, rendered, cached, revalidated))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Concurrency stress test of the database sessions.
+
+Runs a read query (the number of languages per developer) from 1, 2, 4 and 8
+threads at the same time, each in its own app context like the requests of a
+threaded server, on a synthetic database with 10x the size of the bundled
+data.db. The script checks that no query fails, that every app context got
+a session of its own and prints the queries per second. SQLite releases the
+GIL while it executes a query, so the throughput grows with the number of
+threads (up to the number of CPU cores and the pool size).
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.database
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import func, select
+
+from benchmarks.synthetic import create_synthetic_db
+from programming_languages.myflaskapp import create_app
+from programming_languages.myflaskapp.models import Team
+
+SCALE = 10
+THREADS = [1, 2, 4, 8]
+QUERIES_PER_THREAD = 100
+
+QUERY = (select(Team.developer, func.count())
+         .group_by(Team.developer)
+         .order_by(func.count().desc()))
+
+
+def run(app, number_of_threads):
+    """Run the queries from the threads and return the queries per second.
+
+    Raises an AssertionError if a query failed or a session was shared.
+    """
+    database = app.extensions["database"]
+    errors = []
+    # sessions that are in use at the moment
+    active = set()
+    lock = threading.Lock()
+    barrier = threading.Barrier(number_of_threads + 1)
+
+    def worker():
+        barrier.wait()
+        for _ in range(QUERIES_PER_THREAD):
+            with app.app_context():
+                session = database.session()
+                with lock:
+                    if session in active:
+                        errors.append("session shared between threads")
+                    active.add(session)
+                try:
+                    session.execute(QUERY).all()
+                    if database.session() is not session:
+                        errors.append("new session in the same app context")
+                except Exception as error:
+                    errors.append(error)
+                finally:
+                    with lock:
+                        active.discard(session)
+
+    threads = [threading.Thread(target=worker)
+               for _ in range(number_of_threads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    assert not errors, errors[:3]
+    return number_of_threads * QUERIES_PER_THREAD / seconds
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = create_synthetic_db(os.path.join(tmpdir, "data.db"), SCALE)
+        app = create_app({"DATABASE_PATH": path,
+                          "DATABASE_POOL_SIZE": max(THREADS)})
+        # warm-up: open the connections of the pool
+        run(app, max(THREADS))
+        single = None
+        for number_of_threads in THREADS:
+            queries_per_second = run(app, number_of_threads)
+            single = single or queries_per_second
+            print("{} threads: {:8.1f} queries/s ({:.2f}x), no errors"
+                  .format(number_of_threads, queries_per_second,
+                          queries_per_second / single))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark of the streaming export '/export/languages.<format>'.
+
+The rows of df_final are repeated (with numbered names) until there are
+1,000,000 languages. The former way to get the data, creating the whole CSV
+file with DataFrame.to_csv(), is compared with the chunked generators of
+export.py: for each format, the time to the first chunk of bytes (which is
+when a server can start sending the response), the total time and the peak
+of the memory allocated while the file is created are measured.
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.export
+"""
+
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.startup import load
+from programming_languages.myflaskapp.columnar import StringColumn
+from programming_languages.myflaskapp.export import (EXPORT_COLUMNS,
+                                                     export_chunks,
+                                                     parquet_available,
+                                                     select_rows)
+from programming_languages.myflaskapp.table_api import TABLE_COLUMNS
+
+ROWS = 1000000
+DATA_DB = "programming_languages/myflaskapp/data.db"
+
+
+def synthetic_table(rows):
+    """Return df_final repeated until it has the given number of rows."""
+    df = load(DATA_DB)[TABLE_COLUMNS]
+    copies = -(-rows // len(df))
+    df = df.iloc[np.tile(np.arange(len(df)), copies)[:rows]]
+    df = df.reset_index(drop=True)
+    df["Language"] = df["Language"] + " #" + df.index.astype(str)
+    return df
+
+
+def export_columns(df):
+    """Return the columns of the export as they are stored in a snapshot."""
+    columns = {"year": df["Year"].to_numpy(dtype=np.int32)}
+    for name, column in EXPORT_COLUMNS.items():
+        if name != "year":
+            columns[name] = StringColumn.from_strings(
+                df[column].fillna("").tolist())
+    return columns
+
+
+def measure(function):
+    """Return the seconds to the first chunk, the total seconds and the
+    number of bytes of a function that yields chunks of bytes."""
+    start = time.perf_counter()
+    first = None
+    size = 0
+    for chunk in function():
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    return first, time.perf_counter() - start, size
+
+
+def peak_memory(function):
+    """Return the peak of the memory allocated while the chunks are created.
+
+    This is measured in a separate run, as tracing the allocations slows
+    down the code considerably.
+    """
+    tracemalloc.start()
+    for _ in function():
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    df = synthetic_table(ROWS)
+    columns = export_columns(df)
+    names = list(EXPORT_COLUMNS)
+    positions = select_rows(columns["year"])
+
+    cases = [("to_csv (former)",
+              lambda: [df.to_csv(index=False, lineterminator="\n").encode()]),
+             ("csv", lambda: export_chunks("csv", columns, names, positions)),
+             ("csv + gzip", lambda: export_chunks("csv", columns, names,
+                                                  positions, gzip=True)),
+             ("ndjson", lambda: export_chunks("ndjson", columns, names,
+                                              positions)),
+             ("ndjson + gzip", lambda: export_chunks("ndjson", columns, names,
+                                                     positions, gzip=True))]
+    if parquet_available():
+        cases.append(("parquet", lambda: export_chunks("parquet", columns,
+                                                       names, positions)))
+    else:
+        print("(parquet skipped: pyarrow is not installed)")
+
+    print("{} rows".format(ROWS))
+    print("format           first chunk      total        bytes   peak memory")
+    for name, function in cases:
+        first, total, size = measure(function)
+        peak = peak_memory(function)
+        print("{:<15} {:>9.1f} ms {:>8.2f} s {:>12} {:>9.1f} MB".format(
+            name, first * 1000, total, size, peak / 2 ** 20))
+
+
+if __name__ == "__main__":
+    main()
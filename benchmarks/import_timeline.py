@@ -0,0 +1,45 @@
+"""
+Benchmark of the 'import-timeline' command (see importer.py).
+
+Writes the bundled data.db 2500 times (about a million languages and four
+million rows in all tables) as timeline CSV files and imports them, first
+into a new database file and then once more into the now existing file
+(which replaces its content in one transaction).
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.import_timeline
+"""
+
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import write_synthetic_timeline
+from programming_languages.myflaskapp.importer import import_timeline
+
+SCALE = 2500
+TABLES = ["languages", "developers", "companies", "teams", "affiliations",
+          "successions"]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        start = time.perf_counter()
+        paths = write_synthetic_timeline(tmpdir, SCALE)
+        print("{} CSV files ({:.0f} MB) written in {:.1f} s".format(
+            len(paths), sum(os.path.getsize(path) for path in paths) / 1e6,
+            time.perf_counter() - start))
+
+        path = os.path.join(tmpdir, "data.db")
+        for run in ("new file", "existing file"):
+            stats = import_timeline(tmpdir, path)
+            rows = sum(stats[table] for table in TABLES)
+            print("{:<14} {} CSV rows -> {} rows in {:.1f} s "
+                  "({:.0f} rows/s)".format(run, stats["rows"], rows,
+                                           stats["seconds"],
+                                           rows / stats["seconds"]))
+        print(", ".join("{} {}".format(stats[table], table)
+                        for table in TABLES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark of the lineage graph.
+
+Builds random graphs of influences with 10^5 and 10^6 edges and measures the
+time of traversals and shortest path searches without the cache.
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.lineage
+"""
+
+import time
+
+import numpy as np
+
+from programming_languages.myflaskapp.lineage import (LineageGraph,
+                                                      lineage_arrays)
+
+NUMBERS_OF_EDGES = [10 ** 5, 10 ** 6]
+# average number of influences per language
+EDGES_PER_NODE = 2
+QUERIES = 20
+
+
+def random_graph(number_of_edges, seed=0):
+    """Return a LineageGraph with random influences of older languages."""
+    rng = np.random.default_rng(seed)
+    number_of_nodes = number_of_edges // EDGES_PER_NODE
+    successors = rng.integers(1, number_of_nodes, number_of_edges)
+    # every language is influenced by languages with a smaller number
+    predecessors = (rng.random(number_of_edges) * successors).astype(np.int64)
+    lang_ids = np.arange(number_of_nodes).tolist()
+    names = ["language " + str(i) for i in lang_ids]
+    years = [1945 + i * 80 // number_of_nodes for i in lang_ids]
+    arrays = lineage_arrays(lang_ids, predecessors.tolist(),
+                            successors.tolist())
+    nodes = {name: node for node, name in enumerate(names)}
+    return LineageGraph(names, years, nodes.get, arrays)
+
+
+def timed(function, queries):
+    """Return the mean time in ms of function over all queries."""
+    start = time.perf_counter()
+    for query in queries:
+        function(*query)
+    return (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    for number_of_edges in NUMBERS_OF_EDGES:
+        start = time.perf_counter()
+        graph = random_graph(number_of_edges)
+        print("{} edges: graph built in {:.2f} s".format(
+            number_of_edges, time.perf_counter() - start))
+        rng = np.random.default_rng(1)
+        nodes = rng.integers(0, len(graph.names), (QUERIES, 2)).tolist()
+        for direction in ("up", "down"):
+            for depth in (1, 3, None):
+                ms = timed(graph._traverse,
+                           [(node, direction, depth) for node, _ in nodes])
+                print("  traverse {:>4}, depth {:>4}: {:8.2f} ms".format(
+                    direction, str(depth), ms))
+        ms = timed(graph._shortest_path,
+                   [(source, target, "up") for source, target in nodes])
+        print("  shortest path:              {:8.2f} ms".format(ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Memory benchmark of the representation of the languages (see store.py).
+
+For synthetic databases with 10x and 100x the size of the bundled data.db,
+the memory that holds the languages with their developers, companies,
+predecessors and successors is compared for three representations:
+- the parallel lists and DataFrames that the original version of the app
+  kept as global variables (measured with tracemalloc),
+- the string columns that the snapshot stored before the store: one joined
+  string per language and column plus the html links of the
+  '/relationships' page,
+- the compact store: interned string tables and CSR relations, plus the
+  html links of the '/relationships' page, stored once per language.
+The sizes of the numpy arrays of the last two are counted exactly. The time
+to read all columns of 100 random languages is measured as well.
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.memory
+"""
+
+import gc
+import os
+import tempfile
+import timeit
+import tracemalloc
+
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.synthetic import create_synthetic_db
+from programming_languages.myflaskapp.columnar import StringColumn
+from programming_languages.myflaskapp.lineage import lineage_arrays
+from programming_languages.myflaskapp.loader import (fetch_tables,
+                                                     join_by_lang_id,
+                                                     resolve_succession_names,
+                                                     build_final_table)
+from programming_languages.myflaskapp.lookup import (language_links,
+                                                     lookup_arrays)
+from programming_languages.myflaskapp.store import (LanguageStore,
+                                                    store_arrays)
+
+SCALES = [10, 100]
+COLUMNS = ["developers", "companies", "predecessors", "successors"]
+
+
+def original_globals(dbsession):
+    """Return the lists and DataFrames of the original version of the app."""
+    df_Language, df_Team, df_Affiliation, df_Succession = \
+        fetch_tables(dbsession)
+    df_Succession = resolve_succession_names(df_Language, df_Succession)
+    values = {
+        "Language_lang_ids": df_Language["lang_id"].tolist(),
+        "Language_names": df_Language["Name"].tolist(),
+        "Language_years": df_Language["Year"].tolist(),
+        "Team_lang_ids": df_Team["lang_id"].tolist(),
+        "Team_developers": df_Team["developer"].tolist(),
+        "Affiliation_lang_ids": df_Affiliation["lang_id"].tolist(),
+        "Affiliation_companies": df_Affiliation["company"].tolist(),
+        "predecessor_ids": df_Succession["predecessor"].tolist(),
+        "successor_ids": df_Succession["successor"].tolist(),
+        "predecessor_names": df_Succession["predecessor_name"].tolist(),
+        "successor_names": df_Succession["successor_name"].tolist(),
+        "df_Language": df_Language,
+        "df_Teams": join_by_lang_id(df_Team, "lang_id", "developer",
+                                    "Developers", "; "),
+        "df_Affiliation": join_by_lang_id(df_Affiliation, "lang_id",
+                                          "company", "Companies", "; "),
+        "df_predecessor": join_by_lang_id(df_Succession, "successor",
+                                          "predecessor_name", "Predecessors",
+                                          ";"),
+        "df_successor": join_by_lang_id(df_Succession, "predecessor",
+                                        "successor_name", "Successors", ";"),
+        "df_final": build_final_table(df_Language, df_Team, df_Affiliation,
+                                      df_Succession)}
+    return values
+
+
+def retained_bytes(function, *args):
+    """Return the result of the function and the memory it keeps."""
+    gc.collect()
+    tracemalloc.start()
+    result = function(*args)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def string_columns(df_final, lineage):
+    """Return the arrays of the string columns of the former snapshot."""
+    arrays = {"language.year": df_final["Year"].to_numpy(dtype=np.int32)}
+    columns = {"lang_id": "lang_id", "name": "Language"}
+    columns.update({name: name.capitalize() for name in COLUMNS})
+    for name, column in columns.items():
+        values = df_final[column].fillna("").tolist()
+        arrays.update(StringColumn.from_strings(values)
+                      .arrays("language." + name))
+        if name in ("predecessors", "successors"):
+            arrays.update(StringColumn.from_strings(
+                [language_links(value.split(";")) if value else ""
+                 for value in values]).arrays("lookup." + name))
+    # the lineage graph was stored with 64 bit node numbers
+    arrays.update({name: array.astype(np.int64)
+                   for name, array in lineage.items()})
+    return arrays
+
+
+def megabytes(arrays):
+    """Return the size of a dict of arrays in MB."""
+    return sum(array.nbytes for array in arrays.values()) / 2 ** 20
+
+
+def read_rows(columns, rows):
+    """Read all columns of the rows (like the pages of the table)."""
+    for row in rows:
+        for column in columns:
+            column[row]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        print("scale  languages   lists + DataFrames   string columns   "
+              "compact store")
+        for scale in SCALES:
+            path = create_synthetic_db(os.path.join(tmpdir, "data.db"),
+                                       scale)
+            engine = create_engine('sqlite:///' + path)
+            dbsession = sessionmaker(bind=engine)()
+            # the first query compiles and caches the SQLAlchemy statements
+            original_globals(dbsession)
+            values, original_size = retained_bytes(original_globals,
+                                                   dbsession)
+            dbsession.close()
+            engine.dispose()
+
+            df_final = values["df_final"]
+            lang_ids = df_final["lang_id"].tolist()
+            lineage = lineage_arrays(lang_ids, values["predecessor_ids"],
+                                     values["successor_ids"])
+            before = string_columns(df_final, lineage)
+            arrays = store_arrays(
+                lang_ids, df_final["Language"].tolist(),
+                df_final["Year"].tolist(),
+                zip(values["Team_lang_ids"], values["Team_developers"]),
+                zip(values["Affiliation_lang_ids"],
+                    values["Affiliation_companies"]))
+            arrays.update(lineage)
+            arrays.update({name: array for name, array in lookup_arrays(
+                df_final["Language"].tolist(), lineage).items()
+                if name.startswith("lookup.links")})
+
+            print("{:>4}x {:>10} {:>17.1f} MB {:>13.1f} MB {:>12.1f} MB"
+                  .format(scale, len(df_final), original_size / 2 ** 20,
+                          megabytes(before), megabytes(arrays)))
+
+            # reading the columns of 100 random languages
+            rows = np.random.default_rng(0).integers(
+                len(df_final), size=100).tolist()
+            store = LanguageStore(arrays)
+            stores = {"string columns": [
+                StringColumn.from_arrays(before, "language." + name)
+                for name in COLUMNS],
+                "compact store": [getattr(store, name) for name in COLUMNS]}
+            for name, columns in stores.items():
+                timer = timeit.Timer(lambda: read_rows(columns, rows))
+                number, _ = timer.autorange()
+                seconds = min(timer.repeat(repeat=3, number=number)) / number
+                print("      reading 100 languages from the {}: {:.2f} ms"
+                      .format(name, seconds * 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark and query plan check of '/api/query'.
+
+Creates a synthetic database with 100x the size of the bundled data.db
+(without indexes) and measures the time per query for each filter before and
+after the migration that adds the indexes of models.py. After the migration,
+the script asserts with 'EXPLAIN QUERY PLAN' that every filter is answered
+with its index instead of scanning a table.
+see: https://www.sqlite.org/eqp.html
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.query
+"""
+
+import os
+import tempfile
+import timeit
+
+from benchmarks.synthetic import create_synthetic_db
+from programming_languages.myflaskapp import create_app
+from programming_languages.myflaskapp.migrations import migrate
+from programming_languages.myflaskapp.query_api import explain, run_query
+
+SCALE = 100
+
+# filter values, direction and the index that has to be used
+QUERIES = [
+    ("developer", {"developer": "Dennis Ritchie"}, "down",
+     "ix_Team_developer"),
+    ("company", {"company": "Microsoft"}, "down", "ix_Affiliation_company"),
+    ("years", {"year_from": 1970, "year_to": 1975}, "down",
+     "ix_Language_year"),
+    ("descendants", {"lineage": "ALGOL 60"}, "down",
+     "ix_Succession_predecessor"),
+    ("ancestors", {"lineage": "Python"}, "up", "ix_Succession_successor"),
+]
+TABLES = ["Language", "Team", "Affiliation", "Succession"]
+
+
+def measure(session, values, direction):
+    """Return the best time per query in ms."""
+    timer = timeit.Timer(lambda: run_query(session, values, direction))
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=number)) / number * 1000
+
+
+def check_plan(plan, index):
+    """Assert that the plan uses the index and scans none of the tables."""
+    assert any("USING INDEX " + index in line or
+               "USING COVERING INDEX " + index in line
+               for line in plan), plan
+    for table in TABLES:
+        assert not any(line.startswith("SCAN " + table) for line in plan), \
+            plan
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = create_synthetic_db(os.path.join(tmpdir, "data.db"), SCALE,
+                                   indexes=False)
+        app = create_app({"DATABASE_PATH": path})
+        database = app.extensions["database"]
+        before = {}
+        with app.app_context():
+            for name, values, direction, _ in QUERIES:
+                before[name] = measure(database.session, values, direction)
+
+        migrate(path)
+        # new connections for the new indexes and statistics
+        database.dispose()
+
+        print("filter          without indexes   with indexes")
+        with app.app_context():
+            for name, values, direction, index in QUERIES:
+                check_plan(explain(database.session, values, direction),
+                           index)
+                after = measure(database.session, values, direction)
+                print("{:<12} {:>15.3f} ms {:>11.3f} ms".format(
+                    name, before[name], after))
+        print("all query plans use the indexes")
+
+
+if __name__ == "__main__":
+    main()
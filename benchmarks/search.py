@@ -0,0 +1,101 @@
+"""
+Benchmark of the full-text search '/api/search' (see search.py).
+
+The languages, developers and companies of the bundled data.db are copied
+(with numbered names, see synthetic.py) until there are 1,000,000 languages.
+For each query, the time of the inverted index is compared with a scan over
+the normalized texts of all languages, the way a search without index
+works.
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.search
+"""
+
+import sqlite3
+import time
+import timeit
+
+import numpy as np
+
+from benchmarks.synthetic import DATA_DB, suffix
+from programming_languages.myflaskapp.columnar import StringColumn
+from programming_languages.myflaskapp.search import (SearchIndex,
+                                                     parse_query,
+                                                     search_arrays, tokens)
+
+NUMBER_OF_LANGUAGES = 1000000
+QUERIES = ["wirth", "niklaus wirth", "pascal OR modula", "smal*",
+           "microsoft 1234", "java*", "c"]
+
+
+def synthetic_data(number):
+    """Return lang_ids, names and (lang_id, name) pairs of developers and
+    companies of the given number of languages."""
+    connection = sqlite3.connect(DATA_DB)
+    languages = connection.execute("SELECT lang_id, name "
+                                   "FROM Language").fetchall()
+    teams = connection.execute("SELECT lang_id, developer "
+                               "FROM Team").fetchall()
+    affiliations = connection.execute("SELECT lang_id, company "
+                                      "FROM Affiliation").fetchall()
+    connection.close()
+    copies = -(-number // len(languages))
+    lang_ids = [suffix(lang_id, copy) for copy in range(copies)
+                for lang_id, _ in languages][:number]
+    names = [suffix(name, copy) for copy in range(copies)
+             for _, name in languages][:number]
+    developers = [(suffix(lang_id, copy), suffix(developer, copy))
+                  for copy in range(copies) for lang_id, developer in teams]
+    companies = [(suffix(lang_id, copy), suffix(company, copy))
+                 for copy in range(copies)
+                 for lang_id, company in affiliations]
+    return lang_ids, names, developers, companies
+
+
+def scan(texts, query):
+    """Return the number of matches of a query by scanning all texts."""
+    total = 0
+    for terms in parse_query(query):
+        words = [token for token, _ in terms]
+        total += sum(1 for text in texts
+                     if all(word in text for word in words))
+    return total
+
+
+def main():
+    lang_ids, names, developers, companies = synthetic_data(
+        NUMBER_OF_LANGUAGES)
+    start = time.perf_counter()
+    arrays = search_arrays(lang_ids, names, developers, companies)
+    print("index of {} languages built in {:.1f} s ({} tokens, {} "
+          "postings, {:.0f} MB)".format(
+              len(names), time.perf_counter() - start,
+              len(arrays["search.offsets"]) - 1, len(arrays["search.rows"]),
+              sum(array.nbytes for array in arrays.values()) / 2 ** 20))
+
+    # the normalized texts of each language for the scan
+    texts = [" ".join(tokens(name)) for name in names]
+    rows = {lang_id: row for row, lang_id in enumerate(lang_ids)}
+    for lang_id, text in developers + companies:
+        if lang_id in rows:
+            texts[rows[lang_id]] += " " + " ".join(tokens(text))
+
+    index = SearchIndex(StringColumn.from_strings(names),
+                        np.zeros(len(names), dtype=np.int32),
+                        StringColumn.from_strings([""] * len(names)),
+                        StringColumn.from_strings([""] * len(names)),
+                        arrays)
+    print("query                 matches        index         scan")
+    for query in QUERIES:
+        timer = timeit.Timer(lambda: index.search(query))
+        number, _ = timer.autorange()
+        seconds = min(timer.repeat(repeat=3, number=number)) / number
+        start = time.perf_counter()
+        scan(texts, query)
+        scan_seconds = time.perf_counter() - start
+        print("{:<20} {:>8} {:>9.3f} ms {:>9.0f} ms".format(
+            query, index.search(query)["total"], seconds * 1000,
+            scan_seconds * 1000))
+
+
+if __name__ == "__main__":
+    main()
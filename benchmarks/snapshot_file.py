@@ -0,0 +1,100 @@
+"""
+Boot time and memory of worker processes with and without a snapshot file.
+
+For synthetic databases with 1x, 10x and 100x the size of the bundled data.db,
+WORKERS processes are started at the same time, like the workers of a WSGI
+server. Each of them creates the app, loads the data either from the
+database or from a snapshot file (see 'flask build-snapshot') and answers
+one request to '/api/languages'. While all workers are running, each one
+reports its boot time, its resident memory (RSS) and its proportional set
+size (PSS), which divides shared pages by the number of processes that share
+them and is therefore the better measure of the memory per worker.
+see: https://www.kernel.org/doc/html/latest/filesystems/proc.html
+The memory measurement needs Linux.
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.snapshot_file
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import create_synthetic_db
+from programming_languages.myflaskapp.database import Database
+from programming_languages.myflaskapp.reloader import build_snapshot
+
+SCALES = [1, 10, 100]
+WORKERS = 4
+
+
+def memory_kb(pid="self"):
+    """Return the RSS and PSS of a process (default: this one) in kB."""
+    values = {}
+    with open("/proc/{}/smaps_rollup".format(pid)) as file:
+        for line in file:
+            name, _, value = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name] = int(value.split()[0])
+    return values["Rss"], values["Pss"]
+
+
+def worker(database_path, snapshot_path):
+    """Boot the app like a worker, report the measurements and wait."""
+    start = time.perf_counter()
+    from programming_languages.myflaskapp import create_app
+    app = create_app({"DATABASE_PATH": database_path,
+                      "SNAPSHOT_PATH": snapshot_path or None,
+                      "LOAD_DATA_ON_START": True})
+    booted = time.perf_counter() - start
+    assert app.test_client().get("/api/languages").status_code == 200
+    rss, pss = memory_kb()
+    print(json.dumps({"boot_seconds": booted, "rss_kb": rss, "pss_kb": pss}),
+          flush=True)
+    # keep running until all workers have reported
+    sys.stdin.read()
+
+
+def run_workers(database_path, snapshot_path):
+    """Start the workers at the same time and return their reports."""
+    processes = [subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.snapshot_file", "--worker",
+         database_path, snapshot_path],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(WORKERS)]
+    reports = [json.loads(process.stdout.readline())
+               for process in processes]
+    for process in processes:
+        process.stdin.close()
+        process.wait()
+    return reports
+
+
+def main():
+    print("scale  data source    boot ms   RSS MB/worker   PSS MB/worker")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for scale in SCALES:
+            database_path = create_synthetic_db(
+                os.path.join(tmpdir, "data.db"), scale)
+            snapshot_path = os.path.join(tmpdir, "data.snapshot")
+            # the same as 'flask build-snapshot'
+            build_snapshot(Database(database_path)).save(snapshot_path)
+            for source, path in (("database", ""),
+                                 ("snapshot file", snapshot_path)):
+                reports = run_workers(database_path, path)
+                print("{:>4}x  {:<13} {:>8.0f} {:>15.1f} {:>15.1f}".format(
+                    scale, source,
+                    max(report["boot_seconds"] for report in reports) * 1000,
+                    sum(report["rss_kb"] for report in reports)
+                    / len(reports) / 1024,
+                    sum(report["pss_kb"] for report in reports)
+                    / len(reports) / 1024))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--worker"]:
+        worker(*sys.argv[2:4])
+    else:
+        main()
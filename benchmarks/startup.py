@@ -0,0 +1,54 @@
+"""
+Startup time benchmark of the data loading.
+
+Measures how long it takes to fetch all tables and to build df_final for
+synthetic databases with 1x, 10x and 100x the size of the bundled data.db.
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.startup
+"""
+
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.synthetic import create_synthetic_db
+from programming_languages.myflaskapp.loader import (fetch_tables,
+                                                     resolve_succession_names,
+                                                     build_final_table)
+
+SCALES = [1, 10, 100]
+REPEATS = 3
+
+
+def load(path):
+    """Build df_final from the database at path and return it."""
+    engine = create_engine('sqlite:///' + path)
+    dbsession = sessionmaker(bind=engine)()
+    df_Language, df_Team, df_Affiliation, df_Succession = \
+        fetch_tables(dbsession)
+    df_Succession = resolve_succession_names(df_Language, df_Succession)
+    df_final = build_final_table(df_Language, df_Team, df_Affiliation,
+                                 df_Succession)
+    dbsession.close()
+    engine.dispose()
+    return df_final
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for scale in SCALES:
+            path = create_synthetic_db(os.path.join(tmpdir, "data.db"), scale)
+            timings = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                df_final = load(path)
+                timings.append(time.perf_counter() - start)
+            print("{:>4}x: {:>8} languages, best of {}: {:.3f} s".format(
+                scale, len(df_final), REPEATS, min(timings)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Check of the browser caching and compression of the static files.
+
+For each javascript and css file linked on the pages, this script prints the
+number of bytes sent with and without compression, and checks that a
+revalidation request is answered with 304 Not Modified.
+The compressed copies have to be created first:
+your_name@[your_path/flask_test_project]$flask compress-static
+your_name@[your_path/flask_test_project]$python -m benchmarks.static
+"""
+
+import re
+
+from programming_languages.myflaskapp import create_app
+
+PAGES = ["/table", "/relationships", "/charts"]
+
+
+def static_urls(client):
+    """Return the fingerprinted URLs of all static files on the pages."""
+    urls = set()
+    for page in PAGES:
+        html = client.get(page).get_data(as_text=True)
+        urls.update(re.findall(r'(?:src|href)="(/static/[^"]+)"', html))
+    return sorted(urls)
+
+
+def main():
+    client = create_app().test_client()
+    total = {"identity": 0, "gzip": 0, "br": 0}
+    for url in static_urls(client):
+        sizes = []
+        for encoding in total:
+            response = client.get(url, headers={"Accept-Encoding": encoding})
+            sizes.append(len(response.data))
+            total[encoding] += len(response.data)
+            etag = response.headers["ETag"]
+            response.close()
+            revalidation = client.get(url, headers={
+                "Accept-Encoding": encoding, "If-None-Match": etag})
+            assert revalidation.status_code == 304, url
+        print("{:<55} {:>9} {:>9} {:>9}".format(url, *sizes))
+    print("{:<55} {:>9} {:>9} {:>9}".format("total (identity, gzip, br)",
+                                            *total.values()))
+    print("all revalidations answered with 304 Not Modified")
+
+
+if __name__ == "__main__":
+    main()
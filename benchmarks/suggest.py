@@ -0,0 +1,46 @@
+"""
+Benchmark of the autocompletion of language names.
+
+Measures the time per suggestion request for 100 000 synthetic language
+names (copies of the names in the bundled data.db).
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.suggest
+"""
+
+import sqlite3
+import time
+import timeit
+
+from benchmarks.synthetic import DATA_DB, suffix
+from programming_languages.myflaskapp.suggest import (SuggestIndex,
+                                                      suggest_arrays)
+
+NUMBER_OF_NAMES = 100000
+QUERIES = ["py", "c++", "script", "pyhton", "smaltalk"]
+
+
+def synthetic_names(number):
+    """Return the given number of names derived from the bundled data."""
+    connection = sqlite3.connect(DATA_DB)
+    names = [name for (name,) in connection.execute("SELECT name "
+                                                    "FROM Language")]
+    connection.close()
+    return [suffix(names[i % len(names)], i // len(names))
+            for i in range(number)]
+
+
+def main():
+    names = synthetic_names(NUMBER_OF_NAMES)
+    start = time.perf_counter()
+    index = SuggestIndex(names, suggest_arrays(names))
+    print("index of {} names built in {:.2f} s".format(
+        len(names), time.perf_counter() - start))
+    for query in QUERIES:
+        timer = timeit.Timer(lambda: index.suggest(query))
+        number, _ = timer.autorange()
+        ms = min(timer.repeat(repeat=3, number=number)) / number * 1000
+        print("{:>10}: {:.3f} ms".format(query, ms))
+
+
+if __name__ == "__main__":
+    main()
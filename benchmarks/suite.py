@@ -0,0 +1,357 @@
+"""
+Benchmark suite of all routes with a regression check against a baseline.
+
+For the bundled data.db and synthetic databases of larger scales, the suite
+measures:
+- cold start: a fresh Python process creates the app and answers the first
+  request that needs the data,
+- latency: p50, p95 and p99 of each route in ROUTES, requested in a loop
+  through Flask's test client (after a warm-up),
+- load: requests per second and latencies of a mix of routes, sent by
+  CONCURRENCY threads at the same time to a real WSGI server,
+- memory: RSS and PSS per worker process of the server after the load.
+
+The server is werkzeug's WSGI server with one thread per request. WORKERS
+processes accept connections on one shared socket, like the workers of
+gunicorn, and memory-map the data from one snapshot file (see reloader.py).
+Each worker requests all routes once before the load starts.
+The load generator runs in this process, i.e. on the same machine as the
+server. The memory measurement needs Linux.
+
+The results are written as JSON. With --baseline, the metrics in
+MIN_DIFFERENCES are compared with the stored baseline and the script fails
+(exit code 1) if a latency or the memory grew, or the throughput dropped, by
+more than the threshold (default 25 %). Differences below MIN_DIFFERENCES
+are ignored, as they are within the noise of the measurement. Baselines
+are only comparable on the same machine; create one with --update-baseline.
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.suite
+your_name@[your_path/flask_test_project]$python -m benchmarks.suite --scales 1,10,100,1000 --output results.json
+your_name@[your_path/flask_test_project]$python -m benchmarks.suite --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.snapshot_file import memory_kb
+from benchmarks.synthetic import create_synthetic_db
+
+SCALES = [1, 10, 100]
+
+# routes of the latency measurement (name: URL)
+ROUTES = {
+    "about": "/about",
+    "table": "/table",
+    "api_languages": "/api/languages?draw=1&start=0&length=10"
+                     "&order[0][column]=1&order[0][dir]=asc",
+    "api_languages_search": "/api/languages?draw=1&start=0&length=10"
+                            "&order[0][column]=0&order[0][dir]=desc"
+                            "&search[value]=algol",
+    "relationships": "/relationships?language=C",
+    "suggest": "/api/languages/suggest?q=pyt",
+    "lineage": "/api/lineage/ALGOL%2060?direction=down",
+    "query": "/api/query?company=Microsoft",
+    "search": "/api/search?q=niklaus%20wirth",
+    "charts": "/charts",
+    "chart_svg": "/charts/developers.svg",
+    "chart_json": "/api/charts/new-languages.json",
+    "export": "/export/languages.csv?year_from=1990&year_to=1991",
+}
+# routes of the load on the WSGI server
+LOAD_ROUTES = ["table", "api_languages", "api_languages_search",
+               "relationships", "suggest", "lineage", "query", "chart_svg"]
+
+REQUESTS_PER_ROUTE = 200
+SECONDS_PER_ROUTE = 2.0
+CONCURRENCY = [1, 4, 16]
+LOAD_SECONDS = 3.0
+WORKERS = 2
+
+DEFAULT_THRESHOLD = 0.25
+# metrics that are compared with the baseline (by the end of their name) and
+# the smallest differences that count as regression; the p99 latencies are
+# only reported, as they depend on a few requests and vary too much
+MIN_DIFFERENCES = {"p50_ms": 1.0,
+                   "p95_ms": 1.0,
+                   "create_app_ms": 50.0,
+                   "first_response_ms": 50.0,
+                   "mb_per_worker": 5.0,
+                   "requests_per_second": 0.0}
+
+COLD_START_SCRIPT = """
+import time
+start = time.perf_counter()
+from programming_languages.myflaskapp import create_app
+app = create_app({{"DATABASE_PATH": {path!r}}})
+created = time.perf_counter()
+assert app.test_client().get("/api/languages").status_code == 200
+print(created - start, time.perf_counter() - start)
+"""
+
+
+def percentiles(seconds):
+    """Return the p50, p95 and p99 of a list of durations in ms."""
+    cuts = statistics.quantiles([s * 1000 for s in seconds], n=100,
+                                method="inclusive")
+    return {"p50_ms": cuts[49], "p95_ms": cuts[94], "p99_ms": cuts[98]}
+
+
+def cold_start(path):
+    """Return the time to create the app and to the first data response."""
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT.format(path=path)],
+        capture_output=True, text=True, check=True)
+    created, first_response = map(float, result.stdout.split()[-2:])
+    return {"create_app_ms": created * 1000,
+            "first_response_ms": first_response * 1000}
+
+
+def route_latencies(app):
+    """Return the latency percentiles of each route of ROUTES."""
+    client = app.test_client()
+    results = {}
+    for name, url in ROUTES.items():
+        # the first requests load the data and render the charts
+        for _ in range(3):
+            assert client.get(url).status_code == 200, url
+        seconds = []
+        deadline = time.perf_counter() + SECONDS_PER_ROUTE
+        while (len(seconds) < REQUESTS_PER_ROUTE and
+               (len(seconds) < 10 or time.perf_counter() < deadline)):
+            start = time.perf_counter()
+            client.get(url).close()
+            seconds.append(time.perf_counter() - start)
+        results[name] = dict(percentiles(seconds), requests=len(seconds))
+    return results
+
+
+def serve(fd, database_path, snapshot_path):
+    """Run a worker of the WSGI server on the listening socket fd."""
+    import logging
+    from werkzeug.serving import make_server
+    from programming_languages.myflaskapp import create_app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    app = create_app({"DATABASE_PATH": database_path,
+                      "SNAPSHOT_PATH": snapshot_path,
+                      "LOAD_DATA_ON_START": True})
+    server = make_server("127.0.0.1", 0, app, threaded=True, fd=fd)
+    # the first requests of a worker render the charts etc.; the cold start
+    # is measured separately
+    client = app.test_client()
+    for url in ROUTES.values():
+        client.get(url).close()
+    print("ready", flush=True)
+    server.serve_forever()
+
+
+def start_workers(database_path, snapshot_path):
+    """Start the WORKERS on a new socket; return the port and processes."""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(128)
+    processes = [subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.suite", "--serve",
+         str(listener.fileno()), database_path, snapshot_path],
+        stdout=subprocess.PIPE, text=True, pass_fds=[listener.fileno()])
+        for _ in range(WORKERS)]
+    for process in processes:
+        assert process.stdout.readline().strip() == "ready"
+    port = listener.getsockname()[1]
+    # the workers accept the connections on their copies of the socket
+    listener.close()
+    return port, processes
+
+
+def send_load(port, concurrency):
+    """Request LOAD_ROUTES from concurrency threads for LOAD_SECONDS.
+
+    Returns the requests per second, the latency percentiles and the
+    number of failed requests.
+    """
+    seconds = []
+    errors = []
+    deadline = time.perf_counter() + LOAD_SECONDS
+
+    def client(offset):
+        i = offset
+        while time.perf_counter() < deadline:
+            url = ROUTES[LOAD_ROUTES[i % len(LOAD_ROUTES)]]
+            i += 1
+            start = time.perf_counter()
+            try:
+                connection = http.client.HTTPConnection("127.0.0.1", port,
+                                                        timeout=30)
+                connection.request("GET", url)
+                response = connection.getresponse()
+                response.read()
+                connection.close()
+                if response.status != 200:
+                    errors.append(url)
+                    continue
+            except OSError:
+                errors.append(url)
+                continue
+            seconds.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(i,))
+               for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return dict(percentiles(seconds),
+                requests_per_second=len(seconds) / elapsed,
+                errors=len(errors))
+
+
+def benchmark_dataset(database_path, snapshot_path):
+    """Run all measurements for one database; return the results."""
+    from programming_languages.myflaskapp import create_app
+
+    results = {"cold_start": cold_start(database_path)}
+
+    app = create_app({"DATABASE_PATH": database_path})
+    results["routes"] = route_latencies(app)
+    snapshot = app.extensions["snapshot_reloader"].current
+    results["languages"] = len(snapshot.names)
+    # the same as 'flask build-snapshot'
+    snapshot.save(snapshot_path)
+
+    port, processes = start_workers(database_path, snapshot_path)
+    try:
+        results["load"] = {str(concurrency): send_load(port, concurrency)
+                           for concurrency in CONCURRENCY}
+        memory = [memory_kb(process.pid) for process in processes]
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+    results["memory"] = {
+        "workers": WORKERS,
+        "rss_mb_per_worker": sum(rss for rss, _ in memory) / WORKERS / 1024,
+        "pss_mb_per_worker": sum(pss for _, pss in memory) / WORKERS / 1024}
+    return results
+
+
+def flatten(results, prefix=""):
+    """Return the numbers of the nested results as {dotted name: value}."""
+    values = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            values.update(flatten(value, prefix + key + "."))
+        elif isinstance(value, (int, float)):
+            values[prefix + key] = value
+    return values
+
+
+def compare(results, baseline, threshold):
+    """Return the regressions of the results against the baseline.
+
+    Returns a list of (metric, baseline value, value, relative change).
+    Only the metrics in MIN_DIFFERENCES are compared.
+    """
+    regressions = []
+    current = flatten(results["datasets"])
+    for name, base in flatten(baseline["datasets"]).items():
+        value = current.get(name)
+        suffix = next((suffix for suffix in MIN_DIFFERENCES
+                       if name.endswith(suffix)), None)
+        if value is None or suffix is None or base <= 0:
+            continue
+        # throughput regresses when it drops, everything else when it grows
+        difference = (base - value if suffix == "requests_per_second"
+                      else value - base)
+        if (difference > MIN_DIFFERENCES[suffix] and
+                difference / base > threshold):
+            regressions.append((name, base, value, difference / base))
+    return regressions
+
+
+def print_results(results):
+    """Print a summary of the results of each dataset."""
+    for dataset, data in results["datasets"].items():
+        print("{} ({} languages): cold start {:.0f} ms, {:.0f} MB RSS and "
+              "{:.0f} MB PSS per worker".format(
+                  dataset, data["languages"],
+                  data["cold_start"]["first_response_ms"],
+                  data["memory"]["rss_mb_per_worker"],
+                  data["memory"]["pss_mb_per_worker"]))
+        print("  route                      p50 ms     p95 ms     p99 ms")
+        for name, route in data["routes"].items():
+            print("  {:<22} {:>10.2f} {:>10.2f} {:>10.2f}".format(
+                name, route["p50_ms"], route["p95_ms"], route["p99_ms"]))
+        print("  concurrency  requests/s     p50 ms     p95 ms     p99 ms"
+              "  errors")
+        for concurrency, load in data["load"].items():
+            print("  {:>11} {:>11.1f} {:>10.2f} {:>10.2f} {:>10.2f} {:>7}"
+                  .format(concurrency, load["requests_per_second"],
+                          load["p50_ms"], load["p95_ms"], load["p99_ms"],
+                          load["errors"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--scales", default=",".join(map(str, SCALES)),
+                        help="comma separated scales of the datasets "
+                             "(1 = the bundled data.db)")
+    parser.add_argument("--output", help="write the results to this file")
+    parser.add_argument("--baseline",
+                        help="compare the results with this file")
+    parser.add_argument("--threshold", type=float,
+                        default=DEFAULT_THRESHOLD,
+                        help="relative change that counts as regression")
+    parser.add_argument("--update-baseline", action="store_true",
+                        help="write the results to the --baseline file")
+    args = parser.parse_args()
+
+    results = {"environment": {"python": platform.python_version(),
+                               "platform": platform.platform(),
+                               "cpus": os.cpu_count()},
+               "datasets": {}}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for scale in map(int, args.scales.split(",")):
+            database_path = create_synthetic_db(
+                os.path.join(tmpdir, "data_{}.db".format(scale)), scale)
+            snapshot_path = os.path.join(tmpdir,
+                                         "data_{}.snapshot".format(scale))
+            results["datasets"]["{}x".format(scale)] = benchmark_dataset(
+                database_path, snapshot_path)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print("baseline written to " + args.baseline)
+    elif args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        for name, base, value, change in regressions:
+            print("REGRESSION {}: {:.2f} -> {:.2f} ({:+.0%})".format(
+                name, base, value, change))
+        if regressions:
+            sys.exit(1)
+        print("no regressions against " + args.baseline)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--serve"]:
+        serve(int(sys.argv[2]), *sys.argv[3:5])
+    else:
+        main()
@@ -0,0 +1,136 @@
+"""
+Generation of synthetic databases for the benchmarks.
+
+A synthetic database is created by copying the content of the bundled data.db
+several times. Each copy gets its own lang_ids, language names, developers and
+companies, so that a database with scale=10 is a ten times larger version of
+the original one with the same structure.
+The same data can also be written as CSV files for the 'import-timeline'
+command (see importer.py).
+"""
+
+import csv
+import os
+import sqlite3
+
+DATA_DB = "programming_languages/myflaskapp/data.db"
+
+
+def suffix(value, copy):
+    """Return the value for the given copy (the 0th copy is the original)."""
+    if copy == 0 or value is None:
+        return value
+    return value + " #" + str(copy)
+
+
+def create_synthetic_db(path, scale, source=DATA_DB, indexes=True):
+    """Write a database with 'scale' copies of the source data to path.
+
+    The indexes of the source are created as well, unless indexes is False.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(path)
+    # the internal tables of SQLite (e.g. 'sqlite_stat1') cannot be created
+    for (sql,) in src.execute("SELECT sql FROM sqlite_master "
+                              "WHERE type = 'table' "
+                              "AND name NOT LIKE 'sqlite_%'"):
+        dst.execute(sql)
+    index_sqls = src.execute("SELECT sql FROM sqlite_master "
+                             "WHERE type = 'index' "
+                             "AND sql IS NOT NULL").fetchall()
+
+    languages = src.execute("SELECT lang_id, name, year "
+                            "FROM Language").fetchall()
+    developers = src.execute("SELECT name FROM Developer").fetchall()
+    companies = src.execute("SELECT name FROM Company").fetchall()
+    teams = src.execute("SELECT team_id, lang_id, developer "
+                        "FROM Team").fetchall()
+    affiliations = src.execute("SELECT affi_id, lang_id, company "
+                               "FROM Affiliation").fetchall()
+    successions = src.execute("SELECT succ_id, predecessor, successor "
+                              "FROM Succession").fetchall()
+    src.close()
+
+    for copy in range(scale):
+        dst.executemany("INSERT INTO Language VALUES (?, ?, ?)",
+                        [(suffix(lang_id, copy), suffix(name, copy), year)
+                         for lang_id, name, year in languages])
+        dst.executemany("INSERT INTO Developer VALUES (?)",
+                        [(suffix(name, copy),) for (name,) in developers])
+        dst.executemany("INSERT INTO Company VALUES (?)",
+                        [(suffix(name, copy),) for (name,) in companies])
+        dst.executemany("INSERT INTO Team VALUES (?, ?, ?)",
+                        [(copy * len(teams) + team_id,
+                          suffix(lang_id, copy), suffix(developer, copy))
+                         for team_id, lang_id, developer in teams])
+        dst.executemany("INSERT INTO Affiliation VALUES (?, ?, ?)",
+                        [(copy * len(affiliations) + affi_id,
+                          suffix(lang_id, copy), suffix(company, copy))
+                         for affi_id, lang_id, company in affiliations])
+        dst.executemany("INSERT INTO Succession VALUES (?, ?, ?)",
+                        [(copy * len(successions) + succ_id,
+                          suffix(predecessor, copy), suffix(successor, copy))
+                         for succ_id, predecessor, successor in successions])
+    # creating the indexes after inserting the rows is faster
+    if indexes:
+        for (sql,) in index_sqls:
+            dst.execute(sql)
+        dst.execute("ANALYZE")
+    dst.commit()
+    dst.close()
+    return path
+
+
+def write_synthetic_timeline(directory, scale, source=DATA_DB,
+                             copies_per_file=100, lang_ids=True):
+    """Write 'scale' copies of the source data as timeline CSV files.
+
+    The files have the format that the 'import-timeline' command reads (see
+    importer.py), one file per copies_per_file copies. The lang_id column is
+    left out if lang_ids is False. Returns the paths of the files.
+    """
+    src = sqlite3.connect(source)
+    languages = src.execute("SELECT lang_id, name, year FROM Language "
+                            "ORDER BY rowid").fetchall()
+    names = dict((lang_id, name) for lang_id, name, _ in languages)
+    lists = {}
+    for i, sql in enumerate(["SELECT lang_id, developer FROM Team "
+                             "ORDER BY team_id",
+                             "SELECT lang_id, company FROM Affiliation "
+                             "ORDER BY affi_id",
+                             "SELECT successor, predecessor FROM Succession "
+                             "ORDER BY succ_id"]):
+        for lang_id, value in src.execute(sql):
+            if i == 2:
+                value = names[value]
+            lists.setdefault(lang_id, ([], [], []))[i].append(value)
+    src.close()
+
+    header = ["Year", "Name", "Developers", "Companies", "Predecessors"]
+    if lang_ids:
+        header.append("lang_id")
+    paths = []
+    for first in range(0, scale, copies_per_file):
+        path = os.path.join(directory,
+                            "timeline_{:05d}.csv".format(len(paths)))
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(header)
+            for copy in range(first, min(first + copies_per_file, scale)):
+                for lang_id, name, year in languages:
+                    developers, companies, predecessors = \
+                        lists.get(lang_id, ([], [], []))
+                    row = [year, suffix(name, copy),
+                           "; ".join(suffix(value, copy)
+                                     for value in developers),
+                           "; ".join(suffix(value, copy)
+                                     for value in companies),
+                           ";".join(suffix(value, copy)
+                                    for value in predecessors)]
+                    if lang_ids:
+                        row.append(suffix(lang_id, copy))
+                    writer.writerow(row)
+        paths.append(path)
+    return paths
@@ -0,0 +1,66 @@
+"""
+Benchmark of the '/table' page.
+
+Compares the former approach of rendering the whole table with
+DataFrame.to_html() with the server-side processing of '/api/languages'.
+For each synthetic database size, the response size and the time per
+request are measured.
+Run it from the folder that contains the 'programming_languages' folder:
+your_name@[your_path/flask_test_project]$python -m benchmarks.table
+"""
+
+import json
+import os
+import tempfile
+import timeit
+
+from benchmarks.startup import load
+from benchmarks.synthetic import create_synthetic_db
+from programming_languages.myflaskapp.database import Database
+from programming_languages.myflaskapp.reloader import build_snapshot
+from programming_languages.myflaskapp.table_api import TABLE_COLUMNS
+
+SCALES = [1, 10, 100]
+
+
+def to_html(df_final):
+    """Former implementation of the table() route."""
+    df = df_final[TABLE_COLUMNS]
+    df = df.sort_values(["Year", "Language"])
+    return df.to_html(classes=("display dataTable"),
+                      index=False,
+                      na_rep="-",
+                      table_id="mytable")
+
+
+def api_page(table_index):
+    """Current implementation of the api_languages() route."""
+    return json.dumps(table_index.query(draw=1, start=0, length=10,
+                                        search="", order_column=1,
+                                        order_dir="desc"))
+
+
+def measure(function, argument):
+    """Return the size of the result and the best time per call in ms."""
+    size = len(function(argument).encode())
+    timer = timeit.Timer(lambda: function(argument))
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat=3, number=number)) / number
+    return size, seconds * 1000
+
+
+def main():
+    print("scale   to_html: bytes      ms   api: bytes      ms")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for scale in SCALES:
+            path = create_synthetic_db(os.path.join(tmpdir, "data.db"), scale)
+            df_final = load(path)
+            table_index = build_snapshot(Database(path)).table_index
+            html_size, html_ms = measure(to_html, df_final)
+            api_size, api_ms = measure(api_page, table_index)
+            print("{:>4}x {:>15} {:>7.2f} {:>11} {:>7.3f}".format(
+                scale, html_size, html_ms, api_size, api_ms))
+
+
+if __name__ == "__main__":
+    main()
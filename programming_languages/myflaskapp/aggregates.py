@@ -0,0 +1,96 @@
+"""
+Counters from which the charts are drawn.
+
+The AggregateStore counts the languages per year, per developer and per
+company, how many languages each language influenced (its out-degree in the
+graph of influences) and by how many it was influenced (its in-degree). The
+counters are filled in one pass over the rows when a snapshot is built (see
+snapshot.py). A changed database is counted again with the next snapshot,
+as the charts are drawn from the arrays of a snapshot.
+
+Each counter also keeps its entries in a max-heap. The top-k and
+"count >= threshold" queries of the charts only visit the part of the heap
+that belongs to the result instead of sorting all entries.
+see: https://docs.python.org/3/library/heapq.html
+"""
+
+import heapq
+from collections import Counter
+
+# names of the counters
+COUNTERS = ("years", "developers", "companies", "influencers", "followers")
+
+
+class CounterHeap:
+    """Counter with a max-heap of its entries.
+
+    The entries are sorted by descending count and ascending key, so all
+    keys of a counter have to be comparable with each other.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = Counter(counts or {})
+        self._heap = [(-count, key) for key, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+    def top(self, k):
+        """Return the k entries with the highest counts.
+
+        Returns a list of (key, count) tuples sorted by descending count.
+        """
+        result = []
+        # best-first search in the heap: the children of an entry never come
+        # before it, so the candidates come out in the order of the result
+        candidates = [(self._heap[0], 0)] if self._heap else []
+        while candidates and len(result) < k:
+            (count, key), i = heapq.heappop(candidates)
+            result.append((key, -count))
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < len(self._heap):
+                    heapq.heappush(candidates, (self._heap[child], child))
+        return result
+
+    def at_least(self, threshold):
+        """Return all entries with a count of at least threshold.
+
+        Returns a list of (key, count) tuples sorted by descending count and
+        ascending key.
+        """
+        result = []
+        # the subtree below an entry with a lower count can be skipped
+        stack = [0] if self._heap else []
+        while stack:
+            i = stack.pop()
+            count, key = self._heap[i]
+            if -count < threshold:
+                continue
+            result.append((count, key))
+            stack.extend(child for child in (2 * i + 1, 2 * i + 2)
+                         if child < len(self._heap))
+        result.sort()
+        return [(key, -count) for count, key in result]
+
+
+class AggregateStore:
+    """The counters of the charts (see COUNTERS)."""
+
+    def __init__(self, counters=None):
+        self.counters = {name: CounterHeap() for name in COUNTERS}
+        if counters is not None:
+            self.counters.update(counters)
+
+    @classmethod
+    def from_rows(cls, years, developers, companies, predecessor_names,
+                  successor_names):
+        """Count the values of all rows in one pass.
+
+        years contains the year of each language, the other arguments the
+        values of the rows of the 'team', 'affiliation' and 'succession'
+        tables.
+        """
+        return cls({name: CounterHeap(Counter(values)) for name, values in
+                    zip(COUNTERS, (years, developers, companies,
+                                   predecessor_names, successor_names))})
+
+    def __getitem__(self, name):
+        return self.counters[name]
@@ -0,0 +1,254 @@
+"""
+Rendering and caching of the charts.
+
+The static charts are drawn with matplotlib's object-oriented Figure API
+instead of pyplot, so that no global figure is shared between threads. The
+interactive chart is created with plotly and serialized to JSON.
+Each chart is rendered only once per version of the data. The result is then
+kept in memory, together with gzip (and, if the optional 'brotli' package is
+installed, brotli) compressed variants and a strong ETag that is derived from
+its content.
+matplotlib, plotly and pandas take a long time to import. They are therefore
+only imported when the first chart is rendered.
+The charts are drawn from aggregates (the number of languages per year,
+developer, company, ...; see aggregates.py) that are computed when the data
+is loaded and stored as arrays (see columnar.py).
+see: https://matplotlib.org/stable/gallery/user_interfaces/web_application_server_sgskip.html
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+from io import BytesIO
+
+import numpy as np
+
+from programming_languages.myflaskapp.columnar import StringColumn
+from programming_languages.myflaskapp.metrics import count_cache, span
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# a fixed salt for the ids inside the SVG files makes the output reproducible,
+# so that every worker process produces the same bytes and the same ETag
+RC_PARAMS = {'svg.hashsalt': 'programming_languages'}
+
+# minimal number of languages of the entries in the bar charts
+CHART_THRESHOLDS = {"developers": 4,
+                    "companies": 4,
+                    "influencers": 10,
+                    "followers": 5}
+
+# matplotlib's rcParams are global, so only one chart at a time is rendered
+# with its style, even by different ChartCache objects (i.e. snapshots)
+_render_lock = threading.Lock()
+
+
+def plot_new_languages(years, counts):
+    """Plot the number of new languages per year (starting 1945) with plotly.
+
+    years and counts are the aggregates created by chart_arrays().
+    see: https://plotly.com/python/
+    """
+    import pandas as pd
+    import plotly.express as px
+
+    # preparing the data
+    years = [int(year) for year in years]
+    number_of_new_languages = np.asarray(counts, dtype=np.int64)
+
+    mydict = {"years": years,
+              "new languages per year": number_of_new_languages,
+              "token_error_y": [0] * len(years)}
+    df_for_plotly = pd.DataFrame(mydict)
+
+    # creating the plot
+    fig = px.scatter(data_frame=df_for_plotly,
+                     x="years",
+                     y="new languages per year",
+                     error_y="token_error_y",
+                     error_y_minus="new languages per year",
+                     custom_data=["years", "new languages per year"])
+    # "custom_data" was added to suppress the error_y_minus in the hover label
+    # Based on: https://stackoverflow.com/a/63185950/11826257
+    fig.update_traces(
+        hovertemplate="<br>".join([
+            "Years: %{x}",
+            "New Languages: %{customdata[1]}"
+            ]))
+    fig.update_layout(title="Frequency of language creations over the years")
+    fig.update_layout(autosize=False, width=850, height=400)
+    return fig
+
+
+def bar_chart(labels, heights, title, rotation=0):
+    """Create a bar chart in the layout used for all static charts."""
+    from matplotlib.figure import Figure
+
+    fig = Figure()
+    ax = fig.subplots()
+    ax.bar(range(len(labels)),
+           height=heights,
+           width=0.25,
+           color="#99ceff",
+           )
+    ax.set_xticks(range(len(labels)))
+    ax.set_xticklabels(labels, rotation=rotation)
+    ax.set_ylabel('number of languages')
+    ax.set_title(title)
+    if rotation:
+        fig.subplots_adjust(bottom=0.15)
+    return fig
+
+
+def plot_developers(developers, counts):
+    """Plot the most prolific developers."""
+    # introduce newlines to developer names for better visualization
+    labels = [dev.replace(' ', '\n') for dev in developers]
+    return bar_chart(labels, counts, 'Most prolific developers')
+
+
+def plot_companies(companies, counts):
+    """Plot the most supportive companies."""
+    # shorten one long name for better visualization
+    labels = ['Borland' if company == 'Borland Software Corporation'
+              else company for company in companies]
+    return bar_chart(labels, counts, 'Most supportive companies',
+                     rotation=45)
+
+
+def plot_influencers(predecessor_names, counts):
+    """Plot the most influential languages."""
+    # cutting the names at the first space or dash for better graphic display
+    labels = [name.split(" ")[0].split("-")[0] for name in predecessor_names]
+    return bar_chart(labels, counts, 'Most influential languages',
+                     rotation=45)
+
+
+def plot_followers(successor_names, counts):
+    """Plot the languages with the highest number of cited influences."""
+    return bar_chart(successor_names, counts,
+                     'Languages with highest numbers of influencers',
+                     rotation=45)
+
+
+def render_svg(plot, *args):
+    """Call a matplotlib plot function and return the figure as SVG bytes."""
+    from matplotlib import style
+
+    # the seaborn styles were renamed in matplotlib 3.6
+    if 'seaborn-darkgrid' in style.available:
+        seaborn_style = 'seaborn-darkgrid'
+    else:
+        seaborn_style = 'seaborn-v0_8-darkgrid'
+    # the style context temporarily changes matplotlib's rcParams
+    with _render_lock, style.context([seaborn_style, RC_PARAMS]):
+        with span("plot_matplotlib"):
+            fig = plot(*args)
+        buffer = BytesIO()
+        with span("serialize_svg"):
+            fig.savefig(buffer, format="svg", metadata={"Date": None})
+    return buffer.getvalue()
+
+
+def render_json(plot, *args):
+    """Call a plotly plot function and return the figure as JSON bytes."""
+    from plotly.utils import PlotlyJSONEncoder
+
+    with span("plot_plotly"):
+        fig = plot(*args)
+    with span("serialize_json"):
+        return json.dumps(fig, cls=PlotlyJSONEncoder).encode()
+
+
+def compress(body):
+    """Return a dict with the body for each supported content encoding."""
+    with span("compress_chart"):
+        variants = {"identity": body,
+                    "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants["br"] = brotli.compress(body)
+    return variants
+
+
+def chart_arrays(aggregates):
+    """Return the data of the charts as arrays.
+
+    aggregates is the AggregateStore of the data (see aggregates.py). The
+    bar charts only contain the entries with a count of at least
+    CHART_THRESHOLDS.
+    """
+    new_languages = sorted((year, count) for year, count in
+                           aggregates["years"].counts.items()
+                           if year >= 1945)
+    arrays = {"charts.new-languages.years":
+              np.array([year for year, _ in new_languages], dtype=np.int32),
+              "charts.new-languages.counts":
+              np.array([count for _, count in new_languages],
+                       dtype=np.int32)}
+    for name, threshold in CHART_THRESHOLDS.items():
+        entries = aggregates[name].at_least(threshold)
+        arrays.update(StringColumn.from_strings([key for key, _ in entries])
+                      .arrays("charts." + name + ".names"))
+        arrays["charts." + name + ".counts"] = \
+            np.array([count for _, count in entries], dtype=np.int32)
+    return arrays
+
+
+def chart_renderers(arrays):
+    """Return the renderers of all charts for a ChartCache.
+
+    arrays contains the aggregates created by chart_arrays().
+    """
+    def aggregate(name):
+        return (list(StringColumn.from_arrays(arrays,
+                                              "charts." + name + ".names")),
+                arrays["charts." + name + ".counts"])
+
+    return {
+        "new-languages": lambda: render_json(
+            plot_new_languages, arrays["charts.new-languages.years"],
+            arrays["charts.new-languages.counts"]),
+        "developers": lambda: render_svg(plot_developers,
+                                         *aggregate("developers")),
+        "companies": lambda: render_svg(plot_companies,
+                                        *aggregate("companies")),
+        "influencers": lambda: render_svg(plot_influencers,
+                                          *aggregate("influencers")),
+        "followers": lambda: render_svg(plot_followers,
+                                        *aggregate("followers"))}
+
+
+class ChartCache:
+    """In-memory cache of the rendered charts of one data version.
+
+    renderers maps the chart names to functions that return the chart as
+    bytes (see render_svg() and render_json()).
+    """
+
+    def __init__(self, data_version, renderers):
+        self.data_version = data_version
+        self.renderers = renderers
+        self._charts = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """Return the encoded variants (see compress()) and ETag of a chart.
+
+        The chart is rendered on the first call. Raises a KeyError for unknown
+        chart names.
+        """
+        key = (self.data_version, name)
+        count_cache("chart", key in self._charts)
+        if key not in self._charts:
+            render = self.renderers[name]
+            # the lock makes sure that every chart is rendered only once
+            with self._lock:
+                if key not in self._charts:
+                    body = render()
+                    etag = hashlib.sha256(body).hexdigest()
+                    self._charts[key] = (compress(body), etag)
+        return self._charts[key]
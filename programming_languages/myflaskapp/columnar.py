@@ -0,0 +1,294 @@
+"""
+Compact columnar storage of the snapshot data.
+
+All data of a snapshot is kept in flat numpy arrays: numbers in integer
+arrays and strings in one UTF-8 encoded byte array per column together with
+the offsets of the strings (string i is data[offsets[i]:offsets[i+1]]). This
+is the layout that Apache Arrow uses for string columns.
+see: https://arrow.apache.org/docs/format/Columnar.html#variable-size-binary-layout
+
+The arrays of a snapshot can be written to a single file. Opening the file
+memory-maps it read-only, so the arrays are used in place instead of being
+copied into the memory of the process. All worker processes of a server
+therefore share the same pages of the operating system's page cache, and
+opening the file takes about the same time regardless of its size.
+
+Layout of the file: the magic bytes, the length of the header as 8 byte
+little endian integer, the header as JSON (name, dtype, shape and position of
+each array plus the metadata) and finally the arrays, each aligned to 64
+bytes.
+"""
+
+import json
+import mmap
+import os
+import zlib
+
+import numpy as np
+
+MAGIC = b"PLSNAP01"
+ALIGNMENT = 64
+
+
+def encode_strings(strings):
+    """Return the data and offsets arrays of a list of strings."""
+    encoded = [string.encode() for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return data, offsets
+
+
+class StringColumn:
+    """Read-only sequence of strings stored in a data and an offsets array.
+
+    The strings are decoded when they are accessed.
+    """
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        """Create a column from a list of strings."""
+        return cls(*encode_strings(strings))
+
+    @classmethod
+    def from_arrays(cls, arrays, name):
+        """Create the column that is stored under name in arrays."""
+        return cls(arrays[name + ".data"], arrays[name + ".offsets"])
+
+    def arrays(self, name):
+        """Return the arrays of the column under the given name."""
+        return {name + ".data": self.data, name + ".offsets": self.offsets}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("StringColumn index out of range")
+        return self.data[self.offsets[index]:
+                         self.offsets[index + 1]].tobytes().decode()
+
+    def __iter__(self):
+        data = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield data[start:end].decode()
+
+    def take(self, positions):
+        """Return the strings at the positions (an integer array) as list."""
+        # slicing a memoryview is much faster than slicing the numpy array
+        data = memoryview(self.data)
+        return [str(data[start:end], "utf-8") for start, end in
+                zip(self.offsets[positions].tolist(),
+                    self.offsets[positions + 1].tolist())]
+
+
+def intern_strings(strings):
+    """Return the table of the distinct strings and the id of each string.
+
+    The table is a sorted StringColumn in which every string is stored once;
+    the ids are the positions of the strings in the table (as int32 array).
+    """
+    table = sorted(set(strings))
+    ids = {string: i for i, string in enumerate(table)}
+    return (StringColumn.from_strings(table),
+            np.array([ids[string] for string in strings], dtype=np.int32))
+
+
+def csr(rows, values, number_of_rows):
+    """Return the offsets and values arrays of a relation in CSR format.
+
+    rows and values are arrays with one entry per pair of the relation. The
+    values of row i are values[offsets[i]:offsets[i+1]], in the order of the
+    pairs.
+    see: https://en.wikipedia.org/wiki/Sparse_matrix#Compressed_sparse_row_(CSR,_CRS_or_Yale_format)
+    """
+    order = np.argsort(rows, kind="stable")
+    counts = np.bincount(rows, minlength=number_of_rows)
+    offsets = np.zeros(number_of_rows + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets, values[order]
+
+
+def gather(offsets, values, rows):
+    """Return the values of all rows of a CSR relation and their rows."""
+    starts = offsets[rows]
+    lengths = offsets[rows + 1] - starts
+    total = lengths.sum()
+    # positions of the values: the ranges starts[k]:starts[k]+lengths[k]
+    # concatenated with numpy
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    positions = shifts + np.arange(total)
+    return values[positions], np.repeat(rows, lengths)
+
+
+class RelationColumn:
+    """Read-only sequence of the related strings of each row.
+
+    The relation is stored in CSR format (see csr()): the ids of the strings
+    of row i are ids[offsets[i]:offsets[i+1]] and the strings themselves are
+    stored once in the StringColumn strings (see intern_strings()). A row is
+    returned as its strings joined with separator.
+    """
+
+    def __init__(self, offsets, ids, strings, separator):
+        self.offsets = offsets
+        self.ids = ids
+        self.strings = strings
+        self.separator = separator
+
+    @classmethod
+    def from_arrays(cls, arrays, name, strings, separator):
+        """Create the column whose CSR arrays are stored under name."""
+        return cls(arrays[name + ".offsets"], arrays[name + ".ids"], strings,
+                   separator)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def values(self, index):
+        """Return the list of the strings of a row."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("RelationColumn index out of range")
+        start, end = self.offsets[index:index + 2].tolist()
+        # for the few strings of a row, plain indexing is faster than take()
+        data = self.strings.data
+        offsets = self.strings.offsets
+        return [data[offsets[i]:offsets[i + 1]].tobytes().decode()
+                for i in self.ids[start:end].tolist()]
+
+    def __getitem__(self, index):
+        return self.separator.join(self.values(index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def take(self, positions):
+        """Return the joined strings at the positions (an integer array)."""
+        ids, _ = gather(self.offsets, self.ids, positions)
+        strings = self.strings.take(ids)
+        result = []
+        start = 0
+        for length in (self.offsets[positions + 1] -
+                       self.offsets[positions]).tolist():
+            result.append(self.separator.join(strings[start:start + length]))
+            start += length
+        return result
+
+
+def hash_key(key):
+    """Return the hash of a string key (stable across processes)."""
+    return zlib.crc32(key.encode())
+
+
+def hash_slots(keys):
+    """Return the slots array of a HashIndex over the list of keys.
+
+    Keys that occur more than once refer to their last position, as in a
+    dict.
+    """
+    positions = {}
+    for position, key in enumerate(keys):
+        positions[key] = position
+    # a table that is at most half full keeps the probe sequences short
+    size = 1 << max(len(positions) * 2 - 1, 1).bit_length()
+    slots = np.full(size, -1, dtype=np.int32)
+    for key, position in positions.items():
+        slot = hash_key(key) & (size - 1)
+        while slots[slot] >= 0:
+            slot = (slot + 1) & (size - 1)
+        slots[slot] = position
+    return slots
+
+
+class HashIndex:
+    """Hash table from string keys to their positions in a StringColumn.
+
+    The table is an open addressing hash table with linear probing that is
+    stored in a single array, so that it can be memory-mapped like the other
+    arrays.
+    see: https://en.wikipedia.org/wiki/Linear_probing
+    """
+
+    def __init__(self, keys, slots):
+        self.keys = keys
+        self.slots = slots
+
+    def get(self, key):
+        """Return the position of key or None if it is unknown."""
+        mask = len(self.slots) - 1
+        slot = hash_key(key) & mask
+        while True:
+            position = int(self.slots[slot])
+            if position < 0:
+                return None
+            if self.keys[position] == key:
+                return position
+            slot = (slot + 1) & mask
+
+
+def write_arrays(path, arrays, meta):
+    """Write the dict of numpy arrays and the JSON metadata to a file.
+
+    The file is written under a temporary name and then renamed, so that
+    processes which have the old file open keep their consistent copy.
+    """
+    arrays = {name: np.ascontiguousarray(array)
+              for name, array in arrays.items()}
+    entries = {}
+    position = 0
+    for name, array in arrays.items():
+        entries[name] = {"dtype": array.dtype.str,
+                         "shape": list(array.shape),
+                         "position": position}
+        position += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+    header = json.dumps({"meta": meta, "arrays": entries}).encode()
+    # the arrays start at the first aligned position after the header
+    start = len(MAGIC) + 8 + len(header)
+    start += -start % ALIGNMENT
+
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as file:
+        file.write(MAGIC)
+        file.write(len(header).to_bytes(8, "little"))
+        file.write(header)
+        for name, array in arrays.items():
+            file.seek(start + entries[name]["position"])
+            file.write(array.tobytes())
+        file.truncate(start + position)
+    os.replace(temporary_path, path)
+
+
+def read_arrays(path):
+    """Memory-map a file written by write_arrays().
+
+    Returns the dict of read-only numpy arrays and the metadata. Raises a
+    ValueError if the file is not in the expected format.
+    """
+    with open(path, "rb") as file:
+        buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ValueError(path + " is not a snapshot file")
+    header_size = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8],
+                                 "little")
+    header_end = len(MAGIC) + 8 + header_size
+    header = json.loads(buffer[len(MAGIC) + 8:header_end])
+    start = header_end + (-header_end % ALIGNMENT)
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+        arrays[name] = np.frombuffer(
+            buffer, dtype=dtype, count=count,
+            offset=start + entry["position"]).reshape(entry["shape"])
+    return arrays, header["meta"]
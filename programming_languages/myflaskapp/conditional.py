@@ -0,0 +1,128 @@
+"""
+Conditional GET requests for the pages of the app.
+
+The pages are pure functions of the data, the templates, the static files
+(whose fingerprints appear in the links) and the URL. Their ETag is
+therefore derived from these inputs instead of from the rendered page. A
+browser that already has the current version of a page gets a
+'304 Not Modified' answer before any rendering takes place.
+see: https://developer.mozilla.org/en-US/docs/Web/HTTP/Conditional_requests
+
+Rendered pages can additionally be kept in an in-memory LRU cache, so that
+the first visit of other browsers does not render them again either.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request, make_response
+
+from programming_languages.myflaskapp.metrics import count_cache
+
+
+def folders_version(*folders):
+    """Return a hash of the content of all files in the folders."""
+    digest = hashlib.sha256()
+    for folder in folders:
+        for directory, _, filenames in sorted(os.walk(folder)):
+            for filename in sorted(filenames):
+                path = os.path.join(directory, filename)
+                with open(path, "rb") as file:
+                    digest.update(path.encode() + b"\0" + file.read())
+    return digest.hexdigest()
+
+
+def page_etag(endpoint, view_args, args, versions):
+    """Return the ETag of a page from the route, its arguments and versions."""
+    key = repr((endpoint,
+                sorted(view_args.items()),
+                sorted(args.items(multi=True)),
+                versions))
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of rendered pages with a budget in bytes."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag):
+        """Return the (body, mimetype) tuple of a page or None."""
+        with self._lock:
+            page = self._pages.get(etag)
+            if page is not None:
+                self._pages.move_to_end(etag)
+            return page
+
+    def put(self, etag, body, mimetype):
+        """Add a page and remove the least recently used ones if necessary."""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if etag in self._pages:
+                return
+            self._pages[etag] = (body, mimetype)
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, (old_body, _) = self._pages.popitem(last=False)
+                self.size -= len(old_body)
+
+    def clear(self):
+        """Remove all pages."""
+        with self._lock:
+            self._pages.clear()
+            self.size = 0
+
+
+def conditional_page(get_version, get_cache=None):
+    """Decorator for views that adds an ETag and answers conditional GETs.
+
+    get_version is a function that returns the version of the data. The
+    version of the templates and static files is computed on the first
+    request. If get_cache is given, it has to return a ResponseCache in which
+    the rendered pages are stored.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view(*args, **kwargs)
+
+            app = current_app
+            if "FILES_VERSION" not in app.config:
+                app.config["FILES_VERSION"] = folders_version(
+                    os.path.join(app.root_path, app.template_folder),
+                    os.path.join(app.root_path, "static"))
+            etag = page_etag(request.endpoint, kwargs, request.args,
+                             (get_version(), app.config["FILES_VERSION"]))
+
+            cache = get_cache() if get_cache is not None else None
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+            else:
+                page = None
+                if cache is not None:
+                    page = cache.get(etag)
+                    count_cache("page", page is not None)
+                if page is not None:
+                    response = app.response_class(page[0], mimetype=page[1])
+                else:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    if cache is not None:
+                        cache.put(etag, response.get_data(),
+                                  response.mimetype)
+            response.set_etag(etag)
+            # browsers have to ask whether their copy is still up-to-date
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,163 @@
+"""
+Connections to the SQLite database.
+
+The app reads the database through one SQLAlchemy engine per app. Its pool
+keeps the SQLite connections open, so that the pragmas below are only set
+once per connection and SQLite's cache of prepared statements (and
+SQLAlchemy's cache of compiled statements) stays warm. Each connection is only
+used by one thread at a time.
+
+Routes get their session from Database.session, a scoped_session with one
+session per app context. It is removed when the app context ends (see
+create_app() in __init__.py), which returns its connection to the pool.
+see: https://docs.sqlalchemy.org/en/14/orm/contextual.html
+see: https://flask.palletsprojects.com/en/2.0.x/patterns/sqlalchemy/
+
+SQLAlchemy is only imported when the engine is created.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from urllib.parse import quote
+
+from flask import g
+
+logger = logging.getLogger(__name__)
+
+# Pragmas that are set on every new connection. The app only reads, so the
+# connections are made read-only with 'query_only'. The database file is
+# memory-mapped (up to 256 MB) and every connection caches up to 16 MB of
+# pages.
+# see: https://www.sqlite.org/pragma.html
+PRAGMAS = [("mmap_size", 256 * 1024 * 1024),
+           ("cache_size", -16 * 1024),
+           ("query_only", "ON")]
+
+# number of prepared statements that each connection keeps
+CACHED_STATEMENTS = 256
+
+
+def set_pragmas(connection, connection_record=None):
+    """Configure a new SQLite connection (used as SQLAlchemy event)."""
+    for name, value in PRAGMAS:
+        connection.execute("PRAGMA {}={}".format(name, value))
+
+
+def set_wal_mode(connection, connection_record=None):
+    """Switch the database to WAL mode (used as SQLAlchemy event).
+
+    WAL mode lets the connections read while another process (e.g. an
+    import) writes to the database. It needs write access to the file and
+    its folder, for the '-wal' and '-shm' files. If that fails, the database
+    simply stays in its current journal mode.
+    see: https://www.sqlite.org/wal.html
+    """
+    try:
+        connection.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.Error as error:
+        logger.warning("Could not switch the database to WAL mode: %s",
+                       error)
+
+
+def writable(path):
+    """Return whether the database file and its folder can be written."""
+    folder = os.path.dirname(os.path.abspath(path))
+    return os.access(path, os.W_OK) and os.access(folder, os.W_OK)
+
+
+def app_context_id():
+    """Return an id of the current app context (the scope of the sessions)."""
+    return id(g._get_current_object())
+
+
+class Database:
+    """Engine and app context scoped sessions for a SQLite database.
+
+    Both are created on first use.
+    """
+
+    def __init__(self, path, pool_size=5):
+        self.path = path
+        self.pool_size = pool_size
+        self._engine = None
+        self._pid = None
+        self._session = None
+        self._session_pid = None
+        self._lock = threading.RLock()
+
+    @property
+    def engine(self):
+        """The SQLAlchemy engine of the database.
+
+        SQLite connections must not be used across a fork, so a worker
+        process that was forked from the app gets an engine of its own.
+        """
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._engine = self.create_engine()
+                    self._pid = os.getpid()
+        return self._engine
+
+    def create_engine(self):
+        """Create the engine with a pool of configured connections.
+
+        If the database is in a read-only folder (e.g. a read-only checkout
+        or container image), the connections are opened with 'mode=ro' and
+        the journal mode of the file is left as it is.
+        see: https://www.sqlite.org/uri.html
+        """
+        from sqlalchemy import create_engine, event
+        from sqlalchemy.pool import QueuePool
+
+        read_only = not writable(self.path)
+        if not read_only:
+            url = 'sqlite:///' + self.path
+        else:
+            url = 'sqlite:///file:' + quote(self.path) + '?mode=ro&uri=true'
+        # The connect_args argument is necessary to avoid the following error
+        # message when running Flask: "ProgrammingError: SQLite objects
+        # created in a thread can only be used in that same thread"
+        # see: https://stackoverflow.com/a/54740505/11826257
+        # The pool hands every connection to only one thread at a time.
+        engine = create_engine(
+            url,
+            connect_args={'check_same_thread': False,
+                          'cached_statements': CACHED_STATEMENTS},
+            poolclass=QueuePool,
+            pool_size=self.pool_size,
+            max_overflow=self.pool_size)
+        if not read_only:
+            event.listen(engine, "connect", set_wal_mode)
+        event.listen(engine, "connect", set_pragmas)
+        return engine
+
+    @property
+    def session(self):
+        """The scoped_session with one session per app context.
+
+        Like the engine, it is created again in a forked worker process, as
+        its sessions would otherwise keep using the connections of the
+        parent's engine.
+        """
+        if self._session_pid != os.getpid():
+            from sqlalchemy.orm import scoped_session, sessionmaker
+            with self._lock:
+                if self._session_pid != os.getpid():
+                    self._session = scoped_session(
+                        sessionmaker(bind=self.engine),
+                        scopefunc=app_context_id)
+                    self._session_pid = os.getpid()
+        return self._session
+
+    def remove_session(self, exception=None):
+        """Close the session of the app context (used as teardown)."""
+        if self._session_pid == os.getpid():
+            self._session.remove()
+
+    def dispose(self):
+        """Close all connections of the pool."""
+        if self._pid == os.getpid():
+            self._engine.dispose()
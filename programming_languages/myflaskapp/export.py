@@ -0,0 +1,198 @@
+"""
+Streaming export of the joined language data for '/export/languages.<format>'.
+
+The export contains the rows of df_final (one row per language with its year,
+developers, companies, predecessors and successors) in the order of the
+snapshot, optionally reduced to some of the columns and a range of years.
+Instead of creating the whole file in memory, the rows are encoded in chunks
+by a generator. Flask sends each chunk as soon as it is encoded, so the first
+bytes reach the client right away and only one chunk is held in memory at a
+time, no matter how many languages there are.
+see: https://flask.palletsprojects.com/en/2.0.x/patterns/streaming/
+
+CSV and NDJSON (one JSON object per line) can be compressed with gzip while
+they are streamed: a single compressor is used for the whole response and
+flushed after each chunk.
+Parquet files are written with the optional 'pyarrow' package, which is only
+imported when the first Parquet file is requested. Each chunk becomes a row
+group of the file, which is already compressed.
+see: https://arrow.apache.org/docs/python/parquet.html
+"""
+
+import csv
+import importlib.util
+import io
+import json
+import zlib
+
+import numpy as np
+
+# columns of the export (URL parameter name: column name of df_final)
+EXPORT_COLUMNS = {"year": "Year",
+                  "language": "Language",
+                  "developers": "Developers",
+                  "companies": "Companies",
+                  "predecessors": "Predecessors",
+                  "successors": "Successors"}
+
+# formats of the export and their mimetypes
+EXPORT_FORMATS = {"csv": "text/csv",
+                  "ndjson": "application/x-ndjson",
+                  "parquet": "application/vnd.apache.parquet"}
+
+# number of rows per chunk of the response (Parquet: per row group)
+CHUNK_ROWS = {"csv": 2000,
+              "ndjson": 2000,
+              "parquet": 65536}
+
+
+def parquet_available():
+    """Return True if the 'pyarrow' package is installed."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def export_columns(snapshot):
+    """Return the columns of the export of a snapshot (see EXPORT_COLUMNS).
+
+    Missing values are empty strings.
+    """
+    return {"year": snapshot.years,
+            "language": snapshot.names,
+            "developers": snapshot.developers,
+            "companies": snapshot.companies,
+            "predecessors": snapshot.predecessors,
+            "successors": snapshot.successors}
+
+
+def select_rows(years, year_from=None, year_to=None):
+    """Return the positions of the rows within the range of years."""
+    mask = np.ones(len(years), dtype=bool)
+    if year_from is not None:
+        mask &= years >= year_from
+    if year_to is not None:
+        mask &= years <= year_to
+    return np.flatnonzero(mask)
+
+
+def column_chunks(columns, names, positions, size):
+    """Yield the values of the columns names in chunks of size rows.
+
+    Each chunk is a list with one list of values per column.
+    """
+    for start in range(0, len(positions), size):
+        chunk = positions[start:start + size]
+        yield [columns[name][chunk].tolist() if name == "year" else
+               columns[name].take(chunk)
+               for name in names]
+
+
+def csv_chunks(columns, names, positions):
+    """Yield the rows as CSV file (with a header row) in chunks of bytes."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow([EXPORT_COLUMNS[name] for name in names])
+    for values in column_chunks(columns, names, positions,
+                                CHUNK_ROWS["csv"]):
+        writer.writerows(zip(*values))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # the header of an export without rows
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(columns, names, positions):
+    """Yield the rows as JSON objects (one per line) in chunks of bytes.
+
+    Missing values are null.
+    """
+    keys = [EXPORT_COLUMNS[name] for name in names]
+    for values in column_chunks(columns, names, positions,
+                                CHUNK_ROWS["ndjson"]):
+        yield "".join(
+            json.dumps(dict(zip(keys, [value if value != "" else None
+                                       for value in row])),
+                       ensure_ascii=False) + "\n"
+            for row in zip(*values)).encode()
+
+
+class ChunkSink(io.RawIOBase):
+    """Writable file that hands out the bytes written since the last take()."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        """Return and forget the bytes written since the last call."""
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_chunks(columns, names, positions):
+    """Yield the rows as Parquet file in chunks of bytes.
+
+    Missing values are null.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(EXPORT_COLUMNS[name],
+                         pa.int32() if name == "year" else pa.string())
+                        for name in names])
+    sink = ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for values in column_chunks(columns, names, positions,
+                                    CHUNK_ROWS["parquet"]):
+            writer.write_table(pa.table(
+                [column if name == "year" else
+                 [value if value != "" else None for value in column]
+                 for name, column in zip(names, values)],
+                schema=schema))
+            data = sink.take()
+            if data:
+                yield data
+    # the footer of the file is written when the writer is closed
+    yield sink.take()
+
+
+def gzip_chunks(chunks, level=6):
+    """Compress a stream of chunks of bytes into one gzip stream."""
+    # wbits=31: deflate with gzip header and trailer
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        # the flush sends the compressed chunk instead of keeping it back
+        # for the next one
+        data = compressor.compress(chunk) + compressor.flush(
+            zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+EXPORTERS = {"csv": csv_chunks,
+             "ndjson": ndjson_chunks,
+             "parquet": parquet_chunks}
+
+
+def export_chunks(format, columns, names, positions, gzip=False):
+    """Yield the export of the rows at positions in chunks of bytes.
+
+    format is one of the EXPORT_FORMATS and names are the EXPORT_COLUMNS to
+    export. The output is compressed with gzip if gzip is True.
+    """
+    chunks = EXPORTERS[format](columns, names, positions)
+    return gzip_chunks(chunks) if gzip else chunks
@@ -0,0 +1,366 @@
+"""
+Import of the timeline of programming languages from CSV files.
+
+data.db was assembled by hand from the tables of Wikipedia's 'Timeline of
+programming languages'. The 'import-timeline' command builds the database
+from these tables instead, saved as CSV files in one folder (e.g. one file
+per decade, as on Wikipedia):
+your_name@[your_path/flask_test_project]$flask import-timeline timeline/
+
+Each *.csv file needs a header row. The columns are matched by their name,
+ignoring case, spaces and punctuation (so 'Predecessor(s)' works as well):
+- Year: year of the first appearance of the language
+- Name (or Language): name of the language
+- Developers, Companies, Predecessors: semicolon-separated lists (commas
+  cannot be used as separator, they appear in the names of companies)
+- lang_id (optional): id of the language; derived from the name if missing
+Other columns (e.g. 'Successors' of '/export/languages.csv') are ignored.
+
+The values are normalized (Unicode NFC, whitespace collapsed, placeholders
+like '-' treated as empty), and the lists are split and deduplicated. Rows
+of the same language (same lang_id) are merged into one language. The
+predecessors are resolved by their name; unknown predecessors are skipped.
+
+All rows are written in one transaction on a connection of its own. The
+indexes of models.py are dropped first and created again once all rows are
+inserted, which is much faster than updating them with every row. The rows
+are inserted with executemany() in the order of the primary keys. Readers of
+the database (e.g. a running app, see database.py) see the old content until
+the transaction is committed; the app then reloads the data (see
+reloader.py). A new database file is written without a journal, as there is
+nothing to lose if the import fails, and gets the default rollback journal
+at the end, so that it can also be read from a read-only folder (the app
+switches it to WAL mode where it can write, see database.py).
+see: https://www.sqlite.org/pragma.html#pragma_synchronous
+"""
+
+import csv
+import glob
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from programming_languages.myflaskapp.lookup import normalize_name
+
+# column names of the CSV files (lower case letters and digits only) and the
+# fields that they are read into
+COLUMN_ALIASES = {"year": "year",
+                  "name": "name",
+                  "language": "name",
+                  "developer": "developers",
+                  "developers": "developers",
+                  "chiefdeveloper": "developers",
+                  "company": "companies",
+                  "companies": "companies",
+                  "predecessor": "predecessors",
+                  "predecessors": "predecessors",
+                  "langid": "lang_id"}
+
+# separator of the values in the list columns
+LIST_SEPARATOR = ";"
+
+# values that mean "no value" (compared in lower case)
+PLACEHOLDERS = {"", "-", "?", "n/a", "none", "unknown"}
+
+# replacements for lang_ids that are derived from names (as used in data.db,
+# e.g. 'C++' -> 'C_plus_plus', 'Plankalkül' -> 'Plankalkuel')
+LANG_ID_REPLACEMENTS = [("++", "_plus_plus"), ("+", "plus"), ("#", "_sharp"),
+                        ("ä", "ae"), ("ö", "oe"), ("ü", "ue"),
+                        ("Ä", "Ae"), ("Ö", "Oe"), ("Ü", "Ue"), ("ß", "ss")]
+
+# tables in the order in which they are emptied
+TABLES = ["Team", "Affiliation", "Succession", "Language", "Developer",
+          "Company"]
+
+
+def clean(value):
+    """Return the normalized value of a cell ("" for placeholders)."""
+    value = " ".join(value.split())
+    # ASCII text is always in NFC
+    if not value.isascii():
+        value = unicodedata.normalize("NFC", value)
+    return "" if value.lower() in PLACEHOLDERS else value
+
+
+def split_list(value):
+    """Return the normalized values of a list cell as keys of a dict.
+
+    The dict keeps the order of the values and drops duplicates.
+    """
+    if not value:
+        return {}
+    if LIST_SEPARATOR not in value:
+        value = clean(value)
+        return {value: None} if value else {}
+    values = (clean(part) for part in value.split(LIST_SEPARATOR))
+    return dict.fromkeys(part for part in values if part)
+
+
+def parse_year(value):
+    """Return the year in a cell (e.g. '1972' or 'c. 1950') or None."""
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    match = re.search(r"\d+", value)
+    return int(match.group()) if match else None
+
+
+def make_lang_id(name):
+    """Derive a lang_id (letters, digits and '_') from a language name."""
+    for old, new in LANG_ID_REPLACEMENTS:
+        name = name.replace(old, new)
+    name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore")
+    return re.sub(r"[^0-9A-Za-z]+", "_", name.decode()).strip("_") or "_"
+
+
+def column_fields(header):
+    """Return the field of each column of a CSV header (None if unused)."""
+    return [COLUMN_ALIASES.get(re.sub(r"[^0-9a-z]", "", column.lower()))
+            for column in header]
+
+
+def read_timeline(directory):
+    """Yield the rows of all CSV files in the directory as dicts.
+
+    The files are read one row after the other.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, "*.csv")))
+    if not paths:
+        raise ValueError("no *.csv files in " + directory)
+    for path in paths:
+        # 'utf-8-sig' skips the byte order mark that Excel writes
+        with open(path, newline="", encoding="utf-8-sig") as file:
+            reader = csv.reader(file)
+            fields = column_fields(next(reader, []))
+            missing = {"year", "name"} - set(fields)
+            if missing:
+                raise ValueError("{}: missing column(s) {}".format(
+                    path, ", ".join(sorted(missing))))
+            for row in reader:
+                yield {field: value for field, value in zip(fields, row)
+                       if field is not None}
+
+
+def collect_languages(rows, stats):
+    """Normalize and merge the rows into one entry per language.
+
+    Returns a dict {lang_id: [name, year, developers, companies,
+    predecessors]} with the lists as dicts (to keep the order and drop
+    duplicates). Rows without lang_id are merged by their name. Rows without
+    a name or year are skipped and counted in stats.
+    """
+    languages = {}
+    list_fields = ("developers", "companies", "predecessors")
+    # lang_ids derived from names; names that would get the same lang_id
+    # (e.g. 'P' and 'P``') are told apart by a number
+    derived_ids = {}
+    for row in rows:
+        stats["rows"] += 1
+        name = clean(row.get("name", ""))
+        year = parse_year(row.get("year", ""))
+        if not name or year is None:
+            stats["skipped_rows"] += 1
+            continue
+        lang_id = clean(row.get("lang_id", "")) or derived_ids.get(name)
+        if not lang_id:
+            lang_id = base = make_lang_id(name)
+            number = 1
+            while lang_id in languages:
+                number += 1
+                lang_id = "{}_{}".format(base, number)
+            derived_ids[name] = lang_id
+        language = languages.get(lang_id)
+        if language is None:
+            languages[lang_id] = [name, year] + [
+                split_list(row.get(field, "")) for field in list_fields]
+        else:
+            stats["merged_rows"] += 1
+            for i, field in enumerate(list_fields, 2):
+                language[i].update(split_list(row.get(field, "")))
+    return languages
+
+
+def resolve_predecessors(languages, stats):
+    """Return the (predecessor, successor) lang_id pairs of the languages.
+
+    A predecessor is found by its name, by its normalized name (see
+    lookup.py) or by its lang_id, in this order.
+    """
+    by_name = {}
+    for lang_id, language in languages.items():
+        by_name.setdefault(language[0], lang_id)
+    # only built if a name is not found as it is
+    by_normalized_name = None
+    pairs = {}
+    for lang_id, language in languages.items():
+        for name in language[4]:
+            predecessor = by_name.get(name)
+            if predecessor is None:
+                if by_normalized_name is None:
+                    by_normalized_name = {}
+                    for other_name, other_id in by_name.items():
+                        by_normalized_name.setdefault(
+                            normalize_name(other_name), other_id)
+                predecessor = by_normalized_name.get(normalize_name(name))
+            if predecessor is None and name in languages:
+                predecessor = name
+            if predecessor is None:
+                stats["unknown_predecessors"] += 1
+            else:
+                pairs[(predecessor, lang_id)] = None
+    return list(pairs)
+
+
+def schema_sql():
+    """Return the CREATE statements of the tables and indexes of models.py.
+
+    Returns a dict {table name: CREATE TABLE statement} and a list of
+    (index name, CREATE INDEX statement) tuples.
+    """
+    from sqlalchemy.dialects import sqlite
+    from sqlalchemy.schema import CreateIndex, CreateTable
+    from programming_languages.myflaskapp.models import metadata
+
+    dialect = sqlite.dialect()
+    tables = {table.name: str(CreateTable(table).compile(dialect=dialect))
+              for table in metadata.sorted_tables}
+    indexes = [(index.name, str(CreateIndex(index).compile(dialect=dialect)))
+               for table in metadata.sorted_tables
+               for index in sorted(table.indexes, key=lambda i: i.name)]
+    return tables, indexes
+
+
+def write_database(connection, languages, pairs, stats):
+    """Replace the content of the tables with the languages."""
+    tables, indexes = schema_sql()
+    existing = {name for (name,) in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'")}
+    for name, sql in tables.items():
+        if name not in existing:
+            connection.execute(sql)
+    for name, _ in indexes:
+        connection.execute('DROP INDEX IF EXISTS "{}"'.format(name))
+    for name in TABLES:
+        connection.execute('DELETE FROM "{}"'.format(name))
+
+    lang_ids = sorted(languages)
+    connection.executemany(
+        'INSERT INTO "Language" (lang_id, name, year) VALUES (?, ?, ?)',
+        ((lang_id, languages[lang_id][0], languages[lang_id][1])
+         for lang_id in lang_ids))
+    for i, table, key in ((2, "Developer", "developers"),
+                          (3, "Company", "companies")):
+        names = sorted({name for language in languages.values()
+                        for name in language[i]})
+        connection.executemany(
+            'INSERT INTO "{}" (name) VALUES (?)'.format(table),
+            ((name,) for name in names))
+        stats[key] = len(names)
+    # the lists on the pages keep the order of the rows, which is sorted by
+    # the case-insensitive names of the languages (as in data.db)
+    order = sorted(lang_ids,
+                   key=lambda lang_id: (languages[lang_id][0].casefold(),
+                                        lang_id))
+    rank = {lang_id: i for i, lang_id in enumerate(order)}
+    for i, sql in ((2, 'INSERT INTO "Team" (team_id, lang_id, developer) '
+                       'VALUES (?, ?, ?)'),
+                   (3, 'INSERT INTO "Affiliation" (affi_id, lang_id, '
+                       'company) VALUES (?, ?, ?)')):
+        rows = ((lang_id, name) for lang_id in order
+                for name in languages[lang_id][i])
+        connection.executemany(sql, ((row_id, lang_id, name) for row_id,
+                                     (lang_id, name) in enumerate(rows, 1)))
+    connection.executemany(
+        'INSERT INTO "Succession" (succ_id, predecessor, successor) '
+        'VALUES (?, ?, ?)',
+        ((row_id, predecessor, successor) for row_id,
+         (predecessor, successor) in enumerate(sorted(
+             pairs, key=lambda pair: (rank[pair[0]] * len(rank) +
+                                      rank[pair[1]])), 1)))
+
+    # the indexes are built from the complete tables
+    for _, sql in indexes:
+        connection.execute(sql)
+    # statistics from a sample of each index are good enough for the query
+    # planner and much faster to collect
+    connection.execute("PRAGMA analysis_limit=1000")
+    connection.execute("ANALYZE")
+    for table in ("Language", "Team", "Affiliation", "Succession"):
+        (stats[table.lower() + "s"],) = connection.execute(
+            'SELECT count(*) FROM "{}"'.format(table)).fetchone()
+
+
+def import_timeline(directory, database_path):
+    """Import the CSV files in directory into the database.
+
+    The database file is created if it does not exist. Returns a dict with
+    the number of rows read, skipped and merged, the number of unknown
+    predecessors, the number of rows of each table and the seconds taken.
+    """
+    start = time.perf_counter()
+    stats = {"rows": 0, "skipped_rows": 0, "merged_rows": 0,
+             "unknown_predecessors": 0}
+    languages = collect_languages(read_timeline(directory), stats)
+    pairs = resolve_predecessors(languages, stats)
+
+    new = not os.path.exists(database_path)
+    # isolation_level=None: the transaction is managed by the statements
+    # below and also covers the creation and deletion of tables and indexes
+    connection = sqlite3.connect(database_path, isolation_level=None)
+    try:
+        if new:
+            connection.execute("PRAGMA journal_mode=OFF")
+            connection.execute("PRAGMA synchronous=OFF")
+        elif connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            # in WAL mode, this is still safe against corruption
+            connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA cache_size={}".format(-256 * 1024))
+        connection.execute("PRAGMA temp_store=MEMORY")
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            write_database(connection, languages, pairs, stats)
+        except BaseException:
+            # without a journal, the new file is simply removed below
+            if not new:
+                connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        if new:
+            connection.execute("PRAGMA journal_mode=DELETE")
+    except BaseException:
+        connection.close()
+        if new:
+            os.remove(database_path)
+        raise
+    connection.close()
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+
+@click.command("import-timeline")
+@click.argument("csv_dir", type=click.Path(exists=True, file_okay=False))
+@click.option("--database", "database_path", default=None,
+              help="Database file (default: DATABASE_PATH of the app).")
+@with_appcontext
+def import_timeline_command(csv_dir, database_path):
+    """Import the timeline of languages from the CSV files in CSV_DIR."""
+    if database_path is None:
+        database_path = current_app.config["DATABASE_PATH"]
+    try:
+        stats = import_timeline(csv_dir, database_path)
+    except ValueError as error:
+        raise click.ClickException(str(error))
+    click.echo("{rows} rows read ({skipped_rows} skipped, {merged_rows} "
+               "merged into other rows), {unknown_predecessors} unknown "
+               "predecessors skipped".format(**stats))
+    click.echo("{languages} languages, {developers} developers, "
+               "{companies} companies, {teams} teams, {affiliations} "
+               "affiliations, {successions} successions".format(**stats))
+    click.echo("{} written in {:.2f} s".format(database_path,
+                                               stats["seconds"]))
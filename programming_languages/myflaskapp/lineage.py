@@ -0,0 +1,116 @@
+"""
+Graph of the influences between the programming languages.
+
+The 'succession' table is turned into a directed graph with one node per
+language. The edges are stored in compressed sparse row (CSR) format (see
+csr() in columnar.py): for each direction, the neighbours of node i are
+targets[offsets[i]:offsets[i+1]]. The nodes are the rows of the languages,
+so the same arrays serve as the predecessors and successors columns of the
+languages (see store.py).
+
+The graph is traversed breadth-first, one level at a time, with numpy
+operations on whole arrays of nodes. Each level is one step of influence, so
+the traversal can be limited to a maximum depth.
+
+The CSR arrays can be memory-mapped from a snapshot file (see columnar.py).
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from programming_languages.myflaskapp.columnar import csr, gather
+from programming_languages.myflaskapp.lookup import normalize_name
+
+# "up" follows the edges to the predecessors, "down" to the successors
+DIRECTIONS = ("up", "down")
+
+
+def lineage_arrays(lang_ids, predecessors, successors):
+    """Return the edges of the graph in both directions as CSR arrays.
+
+    The nodes are the positions of the lang_ids. predecessors and successors
+    are the lang_ids of the edges from the 'succession' table.
+    """
+    node_of = {lang_id: node for node, lang_id in enumerate(lang_ids)}
+    sources = np.array([node_of[lang_id] for lang_id in predecessors],
+                       dtype=np.int32)
+    targets = np.array([node_of[lang_id] for lang_id in successors],
+                       dtype=np.int32)
+    arrays = {}
+    for direction, edges in (("down", (sources, targets)),
+                             ("up", (targets, sources))):
+        offsets, neighbours = csr(edges[0], edges[1], len(lang_ids))
+        arrays["lineage." + direction + ".offsets"] = offsets
+        arrays["lineage." + direction + ".targets"] = neighbours
+    return arrays
+
+
+class LineageGraph:
+    """Directed graph of the influences between the languages.
+
+    names and years are sequences with one value per node, find is a
+    function that returns the node of a normalized name (or None) and arrays
+    contains the arrays created by lineage_arrays(). Results of traverse()
+    and shortest_path() are cached per query.
+    """
+
+    def __init__(self, names, years, find, arrays, cache_size=4096):
+        self.names = names
+        self.years = years
+        self.find = find
+        self.csr = {direction:
+                    (arrays["lineage." + direction + ".offsets"],
+                     arrays["lineage." + direction + ".targets"])
+                    for direction in DIRECTIONS}
+        self.number_of_edges = len(self.csr["down"][1])
+
+        self.traverse = lru_cache(maxsize=cache_size)(self._traverse)
+        self.shortest_path = lru_cache(maxsize=cache_size)(
+            self._shortest_path)
+
+    def node(self, name):
+        """Return the node of the language name or None if it is unknown."""
+        return self.find(normalize_name(name))
+
+    def _traverse(self, node, direction, depth=None):
+        """Return all languages reachable from node within depth steps.
+
+        Returns a tuple of (node, distance) pairs, sorted by distance and
+        node. depth=None means no limit.
+        """
+        offsets, targets = self.csr[direction]
+        distances = np.full(len(self.names), -1, dtype=np.int32)
+        distances[node] = 0
+        frontier = np.array([node], dtype=np.int64)
+        level = 0
+        reached = []
+        while frontier.size and (depth is None or level < depth):
+            level += 1
+            neighbours, _ = gather(offsets, targets, frontier)
+            frontier = np.unique(neighbours[distances[neighbours] < 0])
+            distances[frontier] = level
+            reached.extend((int(n), level) for n in frontier)
+        return tuple(reached)
+
+    def _shortest_path(self, source, target, direction):
+        """Return the shortest chain of influence from source to target.
+
+        Returns a tuple of nodes that starts with source and ends with target
+        or None if target cannot be reached.
+        """
+        offsets, targets = self.csr[direction]
+        parents = np.full(len(self.names), -1, dtype=np.int64)
+        parents[source] = source
+        frontier = np.array([source], dtype=np.int64)
+        while frontier.size and parents[target] < 0:
+            neighbours, origins = gather(offsets, targets, frontier)
+            new = parents[neighbours] < 0
+            frontier, first = np.unique(neighbours[new], return_index=True)
+            parents[frontier] = origins[new][first]
+        if parents[target] < 0:
+            return None
+        path = [target]
+        while path[-1] != source:
+            path.append(int(parents[path[-1]]))
+        return tuple(reversed(path))
@@ -0,0 +1,104 @@
+"""
+Loading and joining of the database tables.
+
+Each table is fetched with a single bulk query that only selects the needed
+columns, so that no ORM objects have to be created. The rows are then grouped
+with dictionaries and joined with pandas' hash based map and merge operations.
+This keeps the startup time of the app close to linear in the size of the
+data.
+"""
+
+import hashlib
+
+import pandas as pd
+
+from programming_languages.myflaskapp.models import (Language,
+                                                     Succession,
+                                                     Team,
+                                                     Affiliation)
+
+
+def fetch_tables(dbsession):
+    """Fetch the 'language', 'team', 'affiliation' and 'succession' tables.
+
+    Returns a tuple of four DataFrames (one per table).
+    """
+    res = (dbsession.query(Language.lang_id, Language.name, Language.year)
+           .order_by(Language.name).all())
+    df_Language = pd.DataFrame(res, columns=["lang_id", "Name", "Year"])
+
+    res = dbsession.query(Team.lang_id, Team.developer).all()
+    df_Team = pd.DataFrame(res, columns=["lang_id", "developer"])
+
+    res = dbsession.query(Affiliation.lang_id, Affiliation.company).all()
+    df_Affiliation = pd.DataFrame(res, columns=["lang_id", "company"])
+
+    res = dbsession.query(Succession.predecessor, Succession.successor).all()
+    df_Succession = pd.DataFrame(res, columns=["predecessor", "successor"])
+
+    return df_Language, df_Team, df_Affiliation, df_Succession
+
+
+def join_by_lang_id(df, key, column, new_column, separator):
+    """Join all values of a column into one string per key.
+
+    The values keep the order in which they appear in the DataFrame. The
+    result is a DataFrame with the columns 'lang_id' and new_column.
+    """
+    # a single pass with a dict is much faster than pandas' groupby here, as
+    # groupby creates a Series object for every single group
+    groups = {}
+    for key_value, value in zip(df[key].tolist(), df[column].tolist()):
+        groups.setdefault(key_value, []).append(value)
+    return pd.DataFrame({"lang_id": list(groups.keys()),
+                         new_column: [separator.join(values)
+                                      for values in groups.values()]})
+
+
+def resolve_succession_names(df_Language, df_Succession):
+    """Add the language names of predecessors and successors.
+
+    Returns a copy of df_Succession with the additional columns
+    'predecessor_name' and 'successor_name'. Rows which refer to an unknown
+    lang_id are dropped.
+    """
+    names = pd.Series(df_Language["Name"].values,
+                      index=df_Language["lang_id"].values)
+    df = df_Succession.copy()
+    df["predecessor_name"] = df["predecessor"].map(names)
+    df["successor_name"] = df["successor"].map(names)
+    return df.dropna(subset=["predecessor_name", "successor_name"])
+
+
+def build_final_table(df_Language, df_Team, df_Affiliation, df_Succession):
+    """Combine the four tables into one DataFrame with one row per language.
+
+    df_Succession has to contain the name columns added by
+    resolve_succession_names().
+    """
+    df_Teams = join_by_lang_id(df_Team, "lang_id", "developer",
+                               "Developers", "; ")
+    df_Affiliations = join_by_lang_id(df_Affiliation, "lang_id", "company",
+                                      "Companies", "; ")
+    df_predecessor = join_by_lang_id(df_Succession, "successor",
+                                     "predecessor_name", "Predecessors", ";")
+    df_successor = join_by_lang_id(df_Succession, "predecessor",
+                                   "successor_name", "Successors", ";")
+
+    df_final = pd.merge(df_Language, df_Teams, how='left')
+    df_final = pd.merge(df_final, df_Affiliations, how='left')
+    df_final = pd.merge(df_final, df_predecessor, how='left')
+    df_final = pd.merge(df_final, df_successor, how='left')
+    # rename "name" column for better display on the web page
+    df_final.rename(columns={'Name': 'Language'}, inplace=True)
+    return df_final
+
+
+def data_version(df_final):
+    """Return a short hash of the content of df_final.
+
+    The hash changes whenever the data changes and is used as version token
+    for the caches of the app.
+    """
+    hashes = pd.util.hash_pandas_object(df_final, index=False)
+    return hashlib.sha256(hashes.values.tobytes()).hexdigest()[:16]
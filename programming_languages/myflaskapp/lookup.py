@@ -0,0 +1,119 @@
+"""
+Lookup of single languages for the '/relationships' page.
+
+A hash table from the normalized language names to their rows is built
+once when the data is loaded. Looking up a language is then a single hash
+table access. The hash table is stored as arrays (see columnar.py), so that
+it can be memory-mapped from a snapshot file. The values of the language are
+read from the store (see store.py).
+
+The html links to the predecessors and successors are URL encoded and
+escaped once as well: the link to every language that is a predecessor or
+successor of another one is stored once in a string column, and the links
+of a language are read through the edges of the lineage graph (see
+lineage.py) like the names of the store.
+"""
+
+import unicodedata
+from collections import namedtuple
+from urllib.parse import quote_plus
+
+import numpy as np
+from markupsafe import escape
+
+from programming_languages.myflaskapp.columnar import (StringColumn,
+                                                       RelationColumn,
+                                                       HashIndex,
+                                                       hash_slots)
+
+# separator of the links to the predecessors and successors
+LINK_SEPARATOR = ", "
+
+# content of the '/relationships' page for one language
+LanguageRecord = namedtuple("LanguageRecord",
+                            ["name", "year", "developers", "companies",
+                             "predecessors", "successors"])
+
+
+def normalize_name(name):
+    """Return the name in the form that is used as key of the lookup.
+
+    The comparison is case-insensitive and treats equivalent Unicode
+    characters as equal.
+    """
+    return unicodedata.normalize("NFKC", name).casefold()
+
+
+def language_link(name):
+    """Create the html link to the page of the language name."""
+    # URL encode names so that they are equal to GET Method strings
+    # Flask will automatically URL decode the URL parameter
+    return ("<a href=\"/relationships?language=" +
+            quote_plus(name) +
+            "\">" +
+            str(escape(name)) + "</a>")
+
+
+def language_links(names):
+    """Create the html links to the pages of the languages in names."""
+    return LINK_SEPARATOR.join(language_link(name) for name in names)
+
+
+def lookup_arrays(names, lineage):
+    """Return the hash table and the html links of the lookup as arrays.
+
+    names is the list of the language names and lineage contains the arrays
+    created by lineage_arrays() (see lineage.py). Languages that are neither
+    a predecessor nor a successor get an empty link, as it is never shown.
+    """
+    keys = [normalize_name(name) for name in names]
+    arrays = StringColumn.from_strings(keys).arrays("lookup.keys")
+    arrays["lookup.slots"] = hash_slots(keys)
+    linked = np.zeros(len(names), dtype=bool)
+    linked[lineage["lineage.up.targets"]] = True
+    linked[lineage["lineage.down.targets"]] = True
+    arrays.update(StringColumn.from_strings(
+        [language_link(name) if is_linked else ""
+         for name, is_linked in zip(names, linked.tolist())])
+        .arrays("lookup.links"))
+    return arrays
+
+
+class LanguageLookup:
+    """Records of the '/relationships' page by normalized language name.
+
+    store is the LanguageStore of the languages (see store.py) and arrays
+    contains the arrays created by lookup_arrays() and lineage_arrays().
+    """
+
+    def __init__(self, store, arrays):
+        self.index = HashIndex(StringColumn.from_arrays(arrays, "lookup.keys"),
+                               arrays["lookup.slots"])
+        self.store = store
+        # the precomputed links along the edges of the lineage graph
+        links = StringColumn.from_arrays(arrays, "lookup.links")
+        self.predecessor_links = RelationColumn(arrays["lineage.up.offsets"],
+                                                arrays["lineage.up.targets"],
+                                                links, LINK_SEPARATOR)
+        self.successor_links = RelationColumn(arrays["lineage.down.offsets"],
+                                              arrays["lineage.down.targets"],
+                                              links, LINK_SEPARATOR)
+
+    def position(self, key):
+        """Return the row of the normalized name key or None."""
+        return self.index.get(key)
+
+    def get(self, key):
+        """Return the record of the normalized name key or None."""
+        position = self.index.get(key)
+        if position is None:
+            return None
+        language = self.store[position]
+        # columns without a value are shown as a dash
+        return LanguageRecord(
+            name=language.name,
+            year=language.year,
+            developers=self.store.developers[position] or "-",
+            companies=self.store.companies[position] or "-",
+            predecessors=self.predecessor_links[position] or "-",
+            successors=self.successor_links[position] or "-")
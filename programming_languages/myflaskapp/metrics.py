@@ -0,0 +1,246 @@
+"""
+Request metrics, timing spans and sampled profiles of requests.
+
+All metrics are kept in one registry per process (like the default registry
+of the Prometheus client library), as the timing spans are also recorded
+outside of requests, e.g. when the reloader builds a new snapshot in its
+background thread. The route '/metrics' returns them in the Prometheus text
+format.
+see: https://prometheus.io/docs/instrumenting/exposition_formats/
+
+Every request records its latency and the size of its response in
+histograms per route. Note that the latency is measured until the response
+is created, i.e. without the time to send streamed responses (see the
+'/export' routes). The page cache and the chart cache count their hits and
+misses, and span() records the time of named steps (loading the data, the
+pandas joins, plotting, serializing and rendering the templates).
+
+If PROFILE_DIR is set in the app config, requests with the header
+'X-Profile' are profiled with cProfile (a share PROFILE_SAMPLE_RATE of them)
+and the statistics are written to a .prof file in that folder, which can be
+read with the pstats module or a viewer like snakeviz.
+see: https://docs.python.org/3/library/profile.html
+"""
+
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+import flask
+from flask import current_app, g, request
+
+# upper bounds of the histogram buckets (the last bucket is '+Inf')
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name: (type, help text, buckets of histograms)
+METRICS = {
+    "http_requests_total":
+        ("counter", "Number of requests by route, method and status code.",
+         None),
+    "http_request_duration_seconds":
+        ("histogram", "Time to create the response by route.",
+         SECONDS_BUCKETS),
+    "http_response_size_bytes":
+        ("histogram", "Size of the responses with a known length by route.",
+         BYTES_BUCKETS),
+    "cache_requests_total":
+        ("counter", "Lookups in the page and chart caches by result.", None),
+    "span_duration_seconds":
+        ("histogram", "Time of named steps of loading and rendering.",
+         SECONDS_BUCKETS),
+}
+
+# header that asks for a profile of the request
+PROFILE_HEADER = "X-Profile"
+
+
+def label_text(labels):
+    """Return the labels as '{name="value",...}' (or '' without labels)."""
+    if not labels:
+        return ""
+    escaped = ('{}="{}"'.format(name, str(value).replace("\\", "\\\\")
+                                .replace("\n", "\\n").replace('"', '\\"'))
+               for name, value in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def number_text(value):
+    """Return a number in the format of the Prometheus text format."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Number of observed values per bucket and their sum."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # counts[i] is the number of values in (buckets[i - 1], buckets[i]]
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Add a value."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def samples(self, name, labels):
+        """Return the lines of the histogram in the text format."""
+        lines = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),),
+                                self.counts):
+            total += count
+            lines.append("{}_bucket{} {}".format(
+                name, label_text(labels + (("le", number_text(bound)),)),
+                total))
+        lines.append("{}_sum{} {}".format(name, label_text(labels),
+                                          number_text(self.sum)))
+        lines.append("{}_count{} {}".format(name, label_text(labels), total))
+        return lines
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms with labels (see METRICS)."""
+
+    def __init__(self, metrics=METRICS):
+        self.metrics = metrics
+        # values by metric name and tuple of (label, value) pairs
+        self._values = {name: {} for name in metrics}
+        self._lock = threading.Lock()
+
+    def inc(self, name, amount=1, **labels):
+        """Increase a counter."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._values[name]
+            values[key] = values.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """Add a value to a histogram."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._values[name]
+            if key not in values:
+                values[key] = Histogram(self.metrics[name][2])
+            values[key].observe(value)
+
+    def render(self, extra=()):
+        """Return all metrics in the Prometheus text format.
+
+        extra is a list of (name, type, help text, value) tuples of metrics
+        without labels that are kept elsewhere, e.g. by the reloader.
+        """
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, _) in self.metrics.items():
+                lines.append("# HELP {} {}".format(name, help_text))
+                lines.append("# TYPE {} {}".format(name, kind))
+                for labels, value in sorted(self._values[name].items()):
+                    if kind == "histogram":
+                        lines.extend(value.samples(name, labels))
+                    else:
+                        lines.append("{}{} {}".format(
+                            name, label_text(labels), number_text(value)))
+        for name, kind, help_text, value in extra:
+            lines.append("# HELP {} {}".format(name, help_text))
+            lines.append("# TYPE {} {}".format(name, kind))
+            lines.append("{} {}".format(name, number_text(value)))
+        return "\n".join(lines) + "\n"
+
+
+# the registry of this process
+REGISTRY = MetricsRegistry()
+
+
+@contextmanager
+def span(name):
+    """Record the time of the enclosed block under the given name."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe("span_duration_seconds",
+                         time.perf_counter() - start, span=name)
+
+
+def count_cache(cache, hit):
+    """Count a hit or miss of one of the caches."""
+    REGISTRY.inc("cache_requests_total", cache=cache,
+                 result="hit" if hit else "miss")
+
+
+# only one request is profiled at a time, so that the profiles of parallel
+# requests do not slow each other down
+_profile_lock = threading.Lock()
+
+
+def start_request_metrics():
+    """Note the start time and start a profile if it has been requested.
+
+    This and the following functions are registered by create_app().
+    """
+    g.metrics_start = time.perf_counter()
+    profile_dir = current_app.config["PROFILE_DIR"]
+    if (profile_dir and PROFILE_HEADER in request.headers and
+            random.random() < current_app.config["PROFILE_SAMPLE_RATE"] and
+            _profile_lock.acquire(blocking=False)):
+        g.profile = cProfile.Profile()
+        g.profile.enable()
+
+
+def stop_profile():
+    """Stop the profile of the request (if any) and return it."""
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profile.disable()
+        _profile_lock.release()
+    return profile
+
+
+def finish_request_metrics(response):
+    """Record the latency and size of the response and write the profile."""
+    profile = stop_profile()
+    if profile is not None:
+        profile_dir = current_app.config["PROFILE_DIR"]
+        os.makedirs(profile_dir, exist_ok=True)
+        filename = "{}-{}-{}.prof".format(
+            time.strftime("%Y%m%d-%H%M%S"), os.getpid(),
+            re.sub(r"[^\w.-]", "_", request.endpoint or "unmatched"))
+        profile.dump_stats(os.path.join(profile_dir, filename))
+        response.headers["X-Profile-File"] = filename
+
+    if "metrics_start" in g:
+        # the rule instead of the path keeps the number of labels small
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REGISTRY.inc("http_requests_total", route=route,
+                     method=request.method, status=response.status_code)
+        REGISTRY.observe("http_request_duration_seconds",
+                         time.perf_counter() - g.metrics_start, route=route)
+        if response.content_length is not None:
+            REGISTRY.observe("http_response_size_bytes",
+                             response.content_length, route=route)
+    return response
+
+
+def teardown_request_metrics(exception=None):
+    """Stop a profile that was not finished, e.g. after an error."""
+    stop_profile()
+
+
+def render_template(template_name, **context):
+    """Render a template like flask.render_template() and record the time.
+
+    The signals of Flask would need the blinker package, so the time is
+    measured around the call instead.
+    """
+    with span("render_template:" + template_name):
+        return flask.render_template(template_name, **context)
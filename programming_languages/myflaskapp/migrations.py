@@ -0,0 +1,54 @@
+"""
+Migration of existing databases to the schema in models.py.
+
+The tables of data.db were created before models.py was generated, so the
+migration only has to add what was declared in models.py afterwards: the
+indexes. Indexes that exist already are skipped, so the migration can be run
+any number of times. Afterwards, 'ANALYZE' collects the statistics that
+SQLite's query planner uses to choose between the indexes.
+see: https://www.sqlite.org/lang_analyze.html
+
+Run it with the 'migrate-db' command. The app only reads the database, so
+this is done with a connection of its own.
+"""
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+def migrate(database_path):
+    """Create the missing tables and indexes of models.py in the database.
+
+    Returns the names of the created indexes.
+    """
+    from sqlalchemy import create_engine, inspect
+    from programming_languages.myflaskapp.models import metadata
+
+    engine = create_engine('sqlite:///' + database_path)
+    try:
+        with engine.begin() as connection:
+            metadata.create_all(connection)
+            inspector = inspect(connection)
+            created = []
+            for table in metadata.sorted_tables:
+                existing = {index["name"] for index in
+                            inspector.get_indexes(table.name)}
+                for index in sorted(table.indexes, key=lambda i: i.name):
+                    if index.name not in existing:
+                        index.create(connection)
+                        created.append(index.name)
+            connection.exec_driver_sql("ANALYZE")
+    finally:
+        engine.dispose()
+    return created
+
+
+@click.command("migrate-db")
+@with_appcontext
+def migrate_db():
+    """Add the indexes declared in models.py to the database."""
+    created = migrate(current_app.config["DATABASE_PATH"])
+    for name in created:
+        click.echo("created index " + name)
+    click.echo("{} indexes created".format(len(created)))
@@ -6,9 +6,13 @@ in the database.
 The code was produced with sqlacodegen.
 see: https://pypi.org/project/sqlacodegen/
 [bash or cmd]>sqlacodegen --outfile models.py sqlite:///data.db
+
+The indexes (index=True and __table_args__) were added afterwards. They are
+created in existing databases by the 'migrate-db' command (see
+migrations.py).
 """
 
-from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy import Column, ForeignKey, Index, Integer, String
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -33,15 +37,19 @@ class Language(Base):
 
     lang_id = Column(String, primary_key=True)
     name = Column(String)
-    year = Column(Integer, nullable=False)
+    year = Column(Integer, nullable=False, index=True)
+
+    # case-insensitive lookup of the names (see query_api.py)
+    __table_args__ = (Index('ix_Language_name_nocase',
+                            name.collate('NOCASE')),)
 
 
 class Affiliation(Base):
     __tablename__ = 'Affiliation'
 
     affi_id = Column(Integer, primary_key=True)
-    lang_id = Column(ForeignKey('Language.lang_id'))
-    company = Column(ForeignKey('Company.name'))
+    lang_id = Column(ForeignKey('Language.lang_id'), index=True)
+    company = Column(ForeignKey('Company.name'), index=True)
 
     Company = relationship('Company')
     lang = relationship('Language')
@@ -51,8 +59,8 @@ class Succession(Base):
     __tablename__ = 'Succession'
 
     succ_id = Column(Integer, primary_key=True)
-    predecessor = Column(ForeignKey('Language.lang_id'))
-    successor = Column(ForeignKey('Language.lang_id'))
+    predecessor = Column(ForeignKey('Language.lang_id'), index=True)
+    successor = Column(ForeignKey('Language.lang_id'), index=True)
 
     Language = relationship('Language', primaryjoin='Succession.predecessor == Language.lang_id')
     Language1 = relationship('Language', primaryjoin='Succession.successor == Language.lang_id')
@@ -62,8 +70,8 @@ class Team(Base):
     __tablename__ = 'Team'
 
     team_id = Column(Integer, primary_key=True)
-    lang_id = Column(ForeignKey('Language.lang_id'))
-    developer = Column(ForeignKey('Developer.name'))
+    lang_id = Column(ForeignKey('Language.lang_id'), index=True)
+    developer = Column(ForeignKey('Developer.name'), index=True)
 
     Developer = relationship('Developer')
     lang = relationship('Language')
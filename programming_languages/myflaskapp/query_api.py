@@ -0,0 +1,122 @@
+"""
+Filtering of the languages with SQL queries for '/api/query'.
+
+Unlike the other routes, '/api/query' does not use the snapshot but asks the
+database directly. The languages can be filtered by developer, company, a
+range of years and their lineage (all languages that were influenced by a
+language or that influenced it). The filters are answered with the indexes
+declared in models.py (see migrations.py).
+
+The name of the 'lineage' language is compared case-insensitively, like on
+'/relationships' and '/api/lineage'. SQLite's NOCASE collation only folds
+the ASCII letters, though, so other characters have to match exactly.
+see: https://www.sqlite.org/datatype3.html#collation
+
+Each combination of filters is one SELECT statement with bound parameters.
+The statements are built once per combination and SQLAlchemy caches their
+compiled form, so a request only binds the values and executes the statement.
+The rows are fetched as plain tuples without creating ORM objects.
+see: https://docs.sqlalchemy.org/en/14/core/connections.html#sql-compilation-caching
+"""
+
+from functools import lru_cache
+
+from sqlalchemy import bindparam, select
+
+from programming_languages.myflaskapp.models import (Language,
+                                                     Team,
+                                                     Affiliation,
+                                                     Succession)
+
+# names of the filters (and of their URL parameters)
+FILTERS = ("developer", "company", "year_from", "year_to", "lineage")
+
+# maximal number of languages per response
+MAX_LIMIT = 1000
+
+
+@lru_cache(maxsize=None)
+def query_statement(filters, direction=None):
+    """Return the statement for a sorted tuple of filter names.
+
+    direction is "down" for the languages influenced by the 'lineage'
+    language and "up" for the languages that influenced it.
+    """
+    language = Language.__table__
+    team = Team.__table__
+    affiliation = Affiliation.__table__
+    succession = Succession.__table__
+
+    statement = select(language.c.name, language.c.year)
+    if "developer" in filters:
+        statement = statement.where(language.c.lang_id.in_(
+            select(team.c.lang_id)
+            .where(team.c.developer == bindparam("developer"))))
+    if "company" in filters:
+        statement = statement.where(language.c.lang_id.in_(
+            select(affiliation.c.lang_id)
+            .where(affiliation.c.company == bindparam("company"))))
+    if "year_from" in filters:
+        statement = statement.where(language.c.year >= bindparam("year_from"))
+    if "year_to" in filters:
+        statement = statement.where(language.c.year <= bindparam("year_to"))
+    if "lineage" in filters:
+        if direction == "down":
+            source, target = succession.c.predecessor, succession.c.successor
+        else:
+            source, target = succession.c.successor, succession.c.predecessor
+        # all languages reachable from the 'lineage' language, as recursive
+        # common table expression (UNION drops duplicates, so that cycles
+        # in the graph end the recursion)
+        # see: https://www.sqlite.org/lang_with.html#recursive_common_table_expressions
+        lineage = (select(target.label("lang_id"))
+                   .where(source.in_(
+                       select(language.c.lang_id)
+                       .where(language.c.name.collate("NOCASE") ==
+                              bindparam("lineage"))))
+                   .cte("lineage", recursive=True))
+        lineage = lineage.union(select(target)
+                                .where(source == lineage.c.lang_id))
+        statement = statement.where(
+            language.c.lang_id.in_(select(lineage.c.lang_id)))
+    return (statement
+            .order_by(language.c.year, language.c.name)
+            .limit(bindparam("limit"))
+            .offset(bindparam("offset")))
+
+
+def statement_and_parameters(values, direction, limit, offset):
+    """Return the statement and its parameters for the filter values.
+
+    values maps filter names to their values; None means no filter.
+    """
+    filters = tuple(name for name in FILTERS if values.get(name) is not None)
+    statement = query_statement(filters,
+                                direction if "lineage" in filters else None)
+    parameters = {name: values[name] for name in filters}
+    parameters.update(limit=limit, offset=offset)
+    return statement, parameters
+
+
+def run_query(session, values, direction="down", limit=100, offset=0):
+    """Return the languages that match all filters as list of dicts."""
+    statement, parameters = statement_and_parameters(values, direction,
+                                                     limit, offset)
+    rows = session.execute(statement, parameters).all()
+    return [{"name": name, "year": year} for name, year in rows]
+
+
+def explain(session, values, direction="down", limit=100, offset=0):
+    """Return the lines of SQLite's query plan for the filter values.
+
+    see: https://www.sqlite.org/eqp.html
+    """
+    statement, parameters = statement_and_parameters(values, direction,
+                                                     limit, offset)
+    connection = session.connection()
+    compiled = statement.compile(dialect=connection.dialect)
+    parameters = compiled.construct_params(parameters)
+    rows = connection.exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + str(compiled),
+        tuple(parameters[name] for name in compiled.positiontup))
+    return [row[-1] for row in rows]
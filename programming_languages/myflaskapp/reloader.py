@@ -0,0 +1,295 @@
+"""
+Loading and reloading of the data snapshot while the app is running.
+
+The app always serves the current Snapshot (see snapshot.py). It is built
+on first use, so that starting the app and routes that do not need the data
+stay fast. A request fetches the snapshot once (see current_snapshot()), so
+that all of its work sees one consistent state of the data.
+
+The SnapshotReloader watches the database file in a background thread. When
+the file changes, it builds a new snapshot in that thread and then replaces
+the current one by a single assignment. Requests are served from the old
+snapshot in the meantime.
+
+Alternatively, the snapshot can be loaded from a snapshot file that was
+written by the 'build-snapshot' command (set SNAPSHOT_PATH in the app
+config). The file is memory-mapped, so that loading takes almost no time and
+all worker processes share the same memory. Then the reloader watches the
+snapshot file instead of the database, and running 'build-snapshot' again
+makes the running app reload.
+
+The heavy libraries (SQLAlchemy, pandas, ...) are only imported when the
+first snapshot is built from the database.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import click
+from flask import current_app, g
+from flask.cli import with_appcontext
+
+from programming_languages.myflaskapp.metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+def build_snapshot(database):
+    """Build a new snapshot from the current content of the database.
+
+    database is a Database object (see database.py). The snapshot is built
+    with an engine and a session of its own, as it is also built outside of
+    requests. The pooled connections of the app may still read a database
+    file that has been replaced in the meantime (see create_app()).
+    """
+    from sqlalchemy.orm import Session
+    from programming_languages.myflaskapp.snapshot import (Snapshot,
+                                                           snapshot_arrays)
+
+    engine = database.create_engine()
+    dbsession = Session(bind=engine)
+    try:
+        with span("build_snapshot"):
+            return Snapshot(*snapshot_arrays(dbsession))
+    finally:
+        dbsession.close()
+        engine.dispose()
+
+
+def load_snapshot(snapshot_path):
+    """Open a snapshot file written by the 'build-snapshot' command."""
+    from programming_languages.myflaskapp.snapshot import Snapshot
+
+    with span("load_snapshot"):
+        return Snapshot.load(snapshot_path)
+
+
+@click.command("build-snapshot")
+@click.argument("path", required=False)
+@with_appcontext
+def write_snapshot(path):
+    """Build the snapshot from the database and write it to a file.
+
+    PATH defaults to SNAPSHOT_PATH or to data.snapshot next to the database.
+    """
+    database = current_app.extensions["database"]
+    if path is None:
+        path = (current_app.config["SNAPSHOT_PATH"] or
+                os.path.join(os.path.dirname(database.path),
+                             "data.snapshot"))
+    start = time.perf_counter()
+    build_snapshot(database).save(path)
+    click.echo("{}: {} bytes in {:.2f} s".format(
+        path, os.path.getsize(path), time.perf_counter() - start))
+
+
+def current_snapshot():
+    """Return the snapshot that is used for the current request.
+
+    The snapshot is fixed at its first use in a request, so that a reload in
+    the middle of the request does not mix data of two snapshots.
+    """
+    if "snapshot" not in g:
+        g.snapshot = current_app.extensions["snapshot_reloader"].current
+    return g.snapshot
+
+
+def snapshot_version():
+    """Return the data version of the current snapshot (used for ETags)."""
+    return current_snapshot().version
+
+
+def start_request():
+    """Start the reloader and note the start time of the request."""
+    reloader = current_app.extensions["snapshot_reloader"]
+    reloader.ensure_started()
+    g.request_start = time.perf_counter()
+    g.during_reload = reloader.reloading
+
+
+def finish_request(response):
+    """Record the latency of the request in the reload metrics."""
+    if "request_start" in g:
+        reloader = current_app.extensions["snapshot_reloader"]
+        reloader.metrics.add_request(time.perf_counter() - g.request_start,
+                                     g.during_reload or reloader.reloading)
+    return response
+
+
+class ReloadMetrics:
+    """Durations of the reloads and request latencies during reloads."""
+
+    def __init__(self):
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_reload_seconds = 0.0
+        self.total_reload_seconds = 0.0
+        # count, sum and maximum of the request latencies in seconds,
+        # separately for requests during a reload and all other requests
+        self.requests = {True: [0, 0.0, 0.0], False: [0, 0.0, 0.0]}
+        self._lock = threading.Lock()
+
+    def add_reload(self, seconds):
+        """Record a successful reload."""
+        with self._lock:
+            self.reloads += 1
+            self.last_reload_seconds = seconds
+            self.total_reload_seconds += seconds
+
+    def add_failed_reload(self):
+        """Record a reload that raised an error."""
+        with self._lock:
+            self.failed_reloads += 1
+
+    def add_request(self, seconds, during_reload):
+        """Record the latency of a request."""
+        with self._lock:
+            stats = self.requests[during_reload]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def as_dict(self):
+        """Return the metrics as a JSON serializable dict."""
+        with self._lock:
+            result = {"reloads": self.reloads,
+                      "failed_reloads": self.failed_reloads,
+                      "last_reload_seconds": self.last_reload_seconds,
+                      "total_reload_seconds": self.total_reload_seconds}
+            for during_reload, prefix in ((True, "during_reload"),
+                                          (False, "outside_reload")):
+                count, total, maximum = self.requests[during_reload]
+                result[prefix] = {
+                    "requests": count,
+                    "mean_latency_seconds": total / count if count else 0.0,
+                    "max_latency_seconds": maximum}
+            return result
+
+
+class SnapshotReloader:
+    """Reloads the snapshot in a background thread if the database changes.
+
+    A change is detected by the modification time and size of the file and
+    by SQLite's 'PRAGMA data_version', which changes when another connection
+    commits to the database.
+    see: https://www.sqlite.org/pragma.html#pragma_data_version
+    Set sqlite to False if path is not a SQLite database (e.g. a snapshot
+    file); then only the inode, modification time and size are compared.
+    """
+
+    def __init__(self, path, build, interval=2.0, on_swap=None,
+                 sqlite=True):
+        self.path = path
+        self.build = build
+        self.sqlite = sqlite
+        self.interval = interval
+        self.on_swap = on_swap
+        self.metrics = ReloadMetrics()
+        self.reloading = False
+        self._current = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._connection = None
+        self._state = None
+
+    @property
+    def current(self):
+        """The current snapshot (built on the first access)."""
+        snapshot = self._current
+        if snapshot is None:
+            with self._build_lock:
+                if self._current is None:
+                    self._state = self.database_state()
+                    self._current = self.build()
+                snapshot = self._current
+        return snapshot
+
+    @property
+    def loaded(self):
+        """Whether the first snapshot has been built."""
+        return self._current is not None
+
+    def database_state(self):
+        """Return a value that changes whenever the database changes."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        if not self.sqlite:
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size, None)
+        try:
+            if self._connection is None:
+                self._connection = sqlite3.connect(
+                    "file:" + self.path + "?mode=ro", uri=True,
+                    check_same_thread=False)
+            pragma = self._connection.execute("PRAGMA data_version")
+            version = pragma.fetchone()[0]
+        except sqlite3.Error:
+            self._connection = None
+            version = None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size, version)
+
+    def reload(self):
+        """Build a new snapshot and make it the current one."""
+        self.reloading = True
+        start = time.perf_counter()
+        try:
+            snapshot = self.build()
+        except Exception:
+            self.metrics.add_failed_reload()
+            raise
+        finally:
+            self.reloading = False
+        # a single assignment, so requests see either the old or the new one
+        self._current = snapshot
+        self.metrics.add_reload(time.perf_counter() - start)
+        if self.on_swap is not None:
+            self.on_swap(snapshot)
+
+    def check(self):
+        """Reload the snapshot if the database has changed since last time."""
+        state = self.database_state()
+        if not self.loaded:
+            # the first snapshot is built on first use anyway
+            self._state = state
+        elif state is not None and state != self._state:
+            # a replaced file needs a new connection for PRAGMA data_version
+            if self._state is None or state[0] != self._state[0]:
+                self._connection = None
+                state = self.database_state()
+            self.reload()
+            # only after a successful reload, so that a failed one is tried
+            # again at the next check
+            self._state = state
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception:
+                # keep serving the old snapshot and try again later
+                logger.exception("Reloading the data failed")
+
+    def ensure_started(self):
+        """Start the watcher thread unless it runs already in this process.
+
+        Threads do not survive a fork, so the check uses the process id.
+        """
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                # SQLite connections must not be used across a fork
+                self._connection = None
+                self._state = self.database_state()
+                self._thread = threading.Thread(target=self._run,
+                                                name="snapshot-reloader",
+                                                daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
@@ -0,0 +1,252 @@
+"""
+Full-text search over the names of the languages, developers and companies.
+
+The names are split into tokens (words like 'bell', 'labs' or 'c++'). An
+inverted index maps every token to the sorted rows of the languages that
+contain it in one of the three fields (its posting list), together with a
+bit mask of these fields. The index is built once when the data is loaded
+and stored as arrays in CSR format like the trigram index of the
+autocompletion (see suggest.py): the rows of the languages with the i-th
+token are rows[offsets[i]:offsets[i+1]].
+
+A query consists of terms that all have to match; 'OR' separates
+alternatives and a term that ends with '*' matches all tokens that start
+with it, e.g. 'bell labs', 'pascal OR modula' or 'smal*'. The posting lists
+of the terms of an alternative are intersected starting with the shortest
+one, by binary searches for its rows in the longer ones. The cost of a query
+therefore depends on the length of the shortest posting list and not on the
+number of languages.
+The matches are ranked by the fields that contain the terms (the name of
+the language counts most) and then by the length of the name.
+"""
+
+import re
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+
+from programming_languages.myflaskapp.columnar import StringColumn
+from programming_languages.myflaskapp.lookup import normalize_name
+
+# a token starts with a letter or digit; '+' and '#' are kept for 'c++', 'c#'
+TOKEN = re.compile(r"\w[\w+#]*")
+
+# bits of the fields in the masks of the postings
+NAME = 1
+DEVELOPER = 2
+COMPANY = 4
+# weight of a term in the ranking by the fields in which it was found
+FIELD_WEIGHTS = {NAME: 4, DEVELOPER: 2, COMPANY: 1}
+MASK_SCORES = np.array([sum(weight for bit, weight in FIELD_WEIGHTS.items()
+                            if mask & bit)
+                        for mask in range(NAME + DEVELOPER + COMPANY + 1)],
+                       dtype=np.int64)
+
+# maximal number of terms per alternative of a query
+MAX_TERMS = 16
+
+# posting lists that are this many times longer than the rows that remain
+# are intersected by binary searches instead of a byte per language
+BINARY_SEARCH_RATIO = 16
+
+# sorts after every character of the tokens (the end of a prefix range)
+LAST_CHARACTER = "\U0010ffff"
+
+
+def tokens(text):
+    """Return the list of tokens of a text."""
+    return TOKEN.findall(normalize_name(text))
+
+
+def combine(rows, values, function):
+    """Combine the values of equal rows with a numpy ufunc.
+
+    Returns the sorted unique rows and their combined values, e.g. the
+    bitwise or of the field masks. A stable sort and ufunc.reduceat() are
+    considerably faster than np.unique() with return_inverse.
+    """
+    if len(rows) == 0:
+        return rows, values
+    order = np.argsort(rows, kind="stable")
+    rows = rows[order]
+    starts = np.flatnonzero(np.concatenate(([True], rows[1:] != rows[:-1])))
+    return rows[starts], function.reduceat(values[order], starts)
+
+
+def search_arrays(lang_ids, names, developers, companies):
+    """Return the tokens and the posting lists of the index as arrays.
+
+    lang_ids and names are the columns of the languages. developers and
+    companies are sequences of (lang_id, name) pairs, i.e. the rows of the
+    'team' and 'affiliation' tables.
+    """
+    rows = {lang_id: row for row, lang_id in enumerate(lang_ids)}
+    # one entry per occurrence of a token: its id, the row and the field
+    token_ids = {}
+    entry_tokens = array("q")
+    entry_rows = array("q")
+    entry_fields = array("B")
+
+    def add(row, text, field):
+        for token in tokens(text):
+            entry_tokens.append(token_ids.setdefault(token, len(token_ids)))
+            entry_rows.append(row)
+            entry_fields.append(field)
+
+    for row, name in enumerate(names):
+        add(row, name, NAME)
+    for field, pairs in ((DEVELOPER, developers), (COMPANY, companies)):
+        for lang_id, text in pairs:
+            if lang_id in rows and text:
+                add(rows[lang_id], text, field)
+
+    vocabulary = sorted(token_ids)
+    # position of each token id in the sorted vocabulary
+    ranks = np.empty(len(vocabulary), dtype=np.int64)
+    ranks[[token_ids[token] for token in vocabulary]] = \
+        np.arange(len(vocabulary))
+    number_of_rows = max(len(names), 1)
+    keys = (ranks[np.frombuffer(entry_tokens, dtype=np.int64)] *
+            number_of_rows + np.frombuffer(entry_rows, dtype=np.int64))
+    # one posting per token and row (sorted by token and then by row) with
+    # the bits of all fields that contain the token
+    keys, fields = combine(keys, np.frombuffer(entry_fields, dtype=np.uint8),
+                           np.bitwise_or)
+
+    arrays = StringColumn.from_strings(vocabulary).arrays("search.tokens")
+    offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // number_of_rows,
+                          minlength=len(vocabulary)), out=offsets[1:])
+    arrays["search.offsets"] = offsets
+    arrays["search.rows"] = (keys % number_of_rows).astype(np.int32)
+    arrays["search.fields"] = fields
+
+    # position of each language in the order of the length of its name (the
+    # second criterion of the ranking)
+    order = np.argsort([len(name) for name in names], kind="stable")
+    name_ranks = np.empty(len(names), dtype=np.int32)
+    name_ranks[order] = np.arange(len(names), dtype=np.int32)
+    arrays["search.name_ranks"] = name_ranks
+    return arrays
+
+
+def parse_query(query):
+    """Return the alternatives of a query.
+
+    Each alternative is a list of (token, prefix) tuples, where prefix tells
+    whether the term matches all tokens that start with token.
+    """
+    alternatives = [[]]
+    for word in query.split():
+        if word == "OR":
+            alternatives.append([])
+        elif word != "AND":
+            word_tokens = tokens(word)
+            for i, token in enumerate(word_tokens):
+                prefix = word.endswith("*") and i == len(word_tokens) - 1
+                alternatives[-1].append((token, prefix))
+    return [list(dict.fromkeys(terms))[:MAX_TERMS]
+            for terms in alternatives if terms]
+
+
+class SearchIndex:
+    """Inverted index over the names of languages, developers and companies.
+
+    names, years, developers and companies are the columns of the languages
+    and arrays contains the arrays created by search_arrays().
+    """
+
+    def __init__(self, names, years, developers, companies, arrays):
+        self.names = names
+        self.years = years
+        self.developers = developers
+        self.companies = companies
+        self.tokens = StringColumn.from_arrays(arrays, "search.tokens")
+        self.offsets = arrays["search.offsets"]
+        self.rows = arrays["search.rows"]
+        self.fields = arrays["search.fields"]
+        self.name_ranks = arrays["search.name_ranks"]
+
+    def postings(self, token, prefix=False):
+        """Return the rows and field masks of the languages with a token.
+
+        If prefix is True, the postings of all tokens that start with token
+        are combined.
+        """
+        start = bisect_left(self.tokens, token)
+        if prefix:
+            end = bisect_left(self.tokens, token + LAST_CHARACTER, start)
+        elif start < len(self.tokens) and self.tokens[start] == token:
+            end = start + 1
+        else:
+            end = start
+        rows = self.rows[self.offsets[start]:self.offsets[end]]
+        fields = self.fields[self.offsets[start]:self.offsets[end]]
+        if end - start > 1:
+            rows, fields = combine(rows, fields, np.bitwise_or)
+        return rows, fields
+
+    def match(self, terms):
+        """Return the rows that match all terms and their scores."""
+        postings = sorted((self.postings(token, prefix)
+                           for token, prefix in terms),
+                          key=lambda posting: len(posting[0]))
+        rows, fields = postings[0]
+        scores = MASK_SCORES[fields]
+        for other_rows, other_fields in postings[1:]:
+            if len(rows) == 0:
+                break
+            if len(rows) * BINARY_SEARCH_RATIO < len(other_rows):
+                # binary searches for the few remaining rows
+                positions = np.searchsorted(other_rows, rows)
+                np.minimum(positions, len(other_rows) - 1, out=positions)
+                found = other_rows[positions] == rows
+                other_fields = other_fields[positions[found]]
+            else:
+                # lists of similar length: the field masks of the other list
+                # in an array with one byte per language (masks are never 0)
+                marks = np.zeros(len(self.names), dtype=np.uint8)
+                marks[other_rows] = other_fields
+                other_fields = marks[rows]
+                found = other_fields != 0
+                other_fields = other_fields[found]
+            rows = rows[found]
+            scores = scores[found] + MASK_SCORES[other_fields]
+        return rows, scores
+
+    def search(self, query, limit=20, offset=0):
+        """Return the ranked languages that match the query as dict."""
+        results = [self.match(terms) for terms in parse_query(query)]
+        results = [(rows, scores) for rows, scores in results if len(rows)]
+        if not results:
+            return {"total": 0, "languages": []}
+        rows, scores = results[0]
+        if len(results) > 1:
+            # a language that matches several alternatives gets the best
+            # score of them
+            rows, scores = combine(
+                np.concatenate([rows for rows, _ in results]),
+                np.concatenate([scores for _, scores in results]),
+                np.maximum)
+
+        # one integer per match that sorts by score (descending) and by the
+        # length of the name; only the first offset + limit are sorted fully
+        keys = ((scores.max() - scores) * len(self.names) +
+                self.name_ranks[rows])
+        count = min(offset + limit, len(keys))
+        if count < len(keys):
+            selected = np.argpartition(keys, count - 1)[:count]
+        else:
+            selected = np.arange(len(keys))
+        selected = selected[np.argsort(keys[selected])][offset:]
+
+        return {"total": len(rows),
+                "languages": [{"name": self.names[row],
+                               "year": int(self.years[row]),
+                               "developers": self.developers[row],
+                               "companies": self.companies[row],
+                               "score": int(scores[position])}
+                              for position, row in
+                              zip(selected.tolist(),
+                                  rows[selected].tolist())]}
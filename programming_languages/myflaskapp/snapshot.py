@@ -0,0 +1,161 @@
+"""
+Snapshot of all data that the routes derive from the database.
+
+A Snapshot holds everything that the routes derive from one state of the
+database. See reloader.py for how the snapshots are loaded and replaced.
+
+All data of a snapshot is stored in numpy arrays (see columnar.py): the
+languages and their relations in a compact store (see store.py) and the
+indexes of the routes on top of it. The arrays are computed from the
+database by snapshot_arrays(), which does all the expensive work. Creating
+a Snapshot from the arrays only wraps them in the objects that the routes
+use. The arrays can be saved to a file with the 'build-snapshot' command.
+Worker processes that open this file memory-map it, so that they share its
+pages instead of each computing and holding its own copy of the data.
+"""
+
+from programming_languages.myflaskapp.columnar import (write_arrays,
+                                                       read_arrays)
+from programming_languages.myflaskapp.store import (LanguageStore,
+                                                    store_arrays)
+from programming_languages.myflaskapp.table_api import (DataTablesIndex,
+                                                        table_arrays)
+from programming_languages.myflaskapp.lookup import (LanguageLookup,
+                                                     lookup_arrays)
+from programming_languages.myflaskapp.suggest import (SuggestIndex,
+                                                      suggest_arrays)
+from programming_languages.myflaskapp.lineage import (LineageGraph,
+                                                      lineage_arrays)
+from programming_languages.myflaskapp.search import (SearchIndex,
+                                                     search_arrays)
+from programming_languages.myflaskapp.aggregates import AggregateStore
+from programming_languages.myflaskapp.chart_cache import (ChartCache,
+                                                          chart_arrays,
+                                                          chart_renderers)
+from programming_languages.myflaskapp.metrics import span
+
+
+def snapshot_arrays(dbsession):
+    """Compute all arrays of a snapshot from the database.
+
+    Returns the dict of arrays and the data version.
+    """
+    # pandas is only needed here, see loader.py for the bulk queries and the
+    # joins
+    from programming_languages.myflaskapp.loader import (
+        fetch_tables, resolve_succession_names, build_final_table,
+        data_version)
+
+    with span("fetch_tables"):
+        df_Language, df_Team, df_Affiliation, df_Succession = \
+            fetch_tables(dbsession)
+    with span("join_dataframes"):
+        df_Succession = resolve_succession_names(df_Language, df_Succession)
+        # combine all data into one data frame with one row per language
+        df_final = build_final_table(df_Language, df_Team, df_Affiliation,
+                                     df_Succession)
+
+    with span("build_indexes"):
+        # the languages in the order of df_final and their developers and
+        # companies
+        lang_ids = df_final["lang_id"].tolist()
+        names = df_final["Language"].tolist()
+        years = df_final["Year"].tolist()
+        arrays = store_arrays(
+            lang_ids, names, years,
+            zip(df_Team["lang_id"].tolist(), df_Team["developer"].tolist()),
+            zip(df_Affiliation["lang_id"].tolist(),
+                df_Affiliation["company"].tolist()))
+
+        # precomputed search texts and sort orders for the '/table' page
+        arrays.update(table_arrays(df_final))
+
+        # graph of the influences between the languages (also the
+        # predecessors and successors of the store)
+        lineage = lineage_arrays(lang_ids,
+                                 df_Succession["predecessor"].tolist(),
+                                 df_Succession["successor"].tolist())
+        arrays.update(lineage)
+
+        # records of the '/relationships' page by normalized language name
+        arrays.update(lookup_arrays(names, lineage))
+
+        # index for the autocompletion of language names
+        arrays.update(suggest_arrays(names))
+
+        # inverted index for the full-text search
+        arrays.update(search_arrays(
+            lang_ids, names,
+            zip(df_Team["lang_id"].tolist(), df_Team["developer"].tolist()),
+            zip(df_Affiliation["lang_id"].tolist(),
+                df_Affiliation["company"].tolist())))
+
+    with span("aggregate_charts"):
+        # aggregates for the charts
+        aggregates = AggregateStore.from_rows(
+            years, df_Team["developer"].tolist(),
+            df_Affiliation["company"].tolist(),
+            df_Succession["predecessor_name"].tolist(),
+            df_Succession["successor_name"].tolist())
+        arrays.update(chart_arrays(aggregates))
+
+    # version token of the data (changes whenever df_final changes)
+    return arrays, data_version(df_final)
+
+
+class Snapshot:
+    """All data derived from one state of the database.
+
+    arrays and version are the result of snapshot_arrays(). Use
+    Snapshot.load() to open a snapshot file.
+    """
+
+    def __init__(self, arrays, version):
+        self.arrays = arrays
+        self.version = version
+
+        # the languages and their relations; the columns look like the
+        # columns of df_final and the position of a language in them is used
+        # as its row number by all other objects
+        self.store = LanguageStore(arrays)
+        self.lang_ids = self.store.lang_ids
+        self.names = self.store.names
+        self.years = self.store.years
+        self.developers = self.store.developers
+        self.companies = self.store.companies
+        self.predecessors = self.store.predecessors
+        self.successors = self.store.successors
+
+        # rows and sort orders for the table on the '/table' page
+        self.table_index = DataTablesIndex(
+            [self.years, self.names, self.developers, self.companies,
+             self.predecessors, self.successors], arrays)
+
+        # records of the '/relationships' page by normalized language name
+        self.language_lookup = LanguageLookup(self.store, arrays)
+
+        # index for the autocompletion of language names
+        self.suggest_index = SuggestIndex(self.names, arrays)
+
+        # graph of the influences between the languages
+        self.lineage_graph = LineageGraph(self.names, self.years,
+                                          self.language_lookup.position,
+                                          arrays)
+
+        # full-text search over languages, developers and companies
+        self.search_index = SearchIndex(self.names, self.years,
+                                        self.developers, self.companies,
+                                        arrays)
+
+        # the charts are rendered once on their first request
+        self.chart_cache = ChartCache(self.version, chart_renderers(arrays))
+
+    @classmethod
+    def load(cls, path):
+        """Open a snapshot file written by save()."""
+        arrays, meta = read_arrays(path)
+        return cls(arrays, meta["version"])
+
+    def save(self, path):
+        """Write the snapshot to a file that can be opened with load()."""
+        write_arrays(path, self.arrays, {"version": self.version})
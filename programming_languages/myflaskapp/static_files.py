@@ -0,0 +1,141 @@
+"""
+Serving of the static files with long-lived browser caching.
+
+url_for('static', ...) adds a fingerprint of the file content to the URL
+(e.g. /static/1.7.1_jquery.js?v=1f2e3d4c5b6a). As the URL changes whenever
+the file changes, responses to fingerprinted URLs can be cached by browsers
+for a year without revalidation.
+
+The 'compress-static' command writes gzip (and, if the optional 'brotli'
+package is installed, brotli) compressed copies next to the static files.
+These are sent instead of the originals to browsers that accept the
+encoding, so that no compression takes place during the requests.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+
+import click
+from flask import current_app, request, send_from_directory
+from flask.cli import with_appcontext
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# file types that are worth compressing
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".json", ".svg", ".txt", ".html")
+
+# preferred content encodings and the file extension of their copies
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+CACHE_CONTROL_IMMUTABLE = "public, max-age=31536000, immutable"
+
+# fingerprints by path, together with the modification time of the file
+_fingerprints = {}
+
+
+def fingerprint(path):
+    """Return a short hash of the file content or None if there is no file."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    if path not in _fingerprints or _fingerprints[path][0] != mtime:
+        with open(path, "rb") as file:
+            digest = hashlib.sha256(file.read()).hexdigest()[:12]
+        _fingerprints[path] = (mtime, digest)
+    return _fingerprints[path][1]
+
+
+def precompressed(path, accept_encodings):
+    """Choose the compressed copy of a file that the browser accepts.
+
+    Returns the path of the file to send and its content encoding (None for
+    the original file). Copies that are older than the file are ignored.
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return path, None
+    for encoding, extension in ENCODINGS:
+        if accept_encodings[encoding]:
+            try:
+                if os.stat(path + extension).st_mtime_ns >= mtime:
+                    return path + extension, encoding
+            except OSError:
+                pass
+    return path, None
+
+
+def compress_static_folder(folder):
+    """Write compressed copies of all compressible files in folder.
+
+    Returns a list of (path, original size, compressed size) tuples.
+    """
+    results = []
+    for directory, _, filenames in os.walk(folder):
+        for filename in sorted(filenames):
+            if not filename.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(directory, filename)
+            with open(path, "rb") as file:
+                content = file.read()
+            copies = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                copies[".br"] = brotli.compress(content)
+            for extension, compressed in copies.items():
+                # copies that are not smaller than the original are useless
+                if len(compressed) >= len(content):
+                    continue
+                with open(path + extension, "wb") as file:
+                    file.write(compressed)
+                results.append((path + extension, len(content),
+                                len(compressed)))
+    return results
+
+
+def static_folder():
+    """Return the path of the folder with the static files of the app."""
+    return os.path.join(current_app.root_path, "static")
+
+
+def add_static_fingerprint(endpoint, values):
+    """Add the fingerprint to the URLs of static files built by url_for."""
+    if endpoint == "static" and "filename" in values:
+        version = fingerprint(os.path.join(static_folder(),
+                                           values["filename"]))
+        if version is not None:
+            values["v"] = version
+
+
+def send_static_file(filename):
+    """Send a static file, precompressed if the browser accepts it."""
+    folder = static_folder()
+    path = os.path.join(folder, filename)
+    sent_path, encoding = precompressed(path, request.accept_encodings)
+    response = send_from_directory(folder,
+                                   os.path.relpath(sent_path, folder),
+                                   mimetype=mimetypes.guess_type(filename)[0])
+    if encoding is not None:
+        response.content_encoding = encoding
+    response.vary.add("Accept-Encoding")
+    if request.args.get("v") == fingerprint(path):
+        response.headers["Cache-Control"] = CACHE_CONTROL_IMMUTABLE
+    else:
+        # revalidate URLs without (current) fingerprint on every use
+        response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+@click.command("compress-static")
+@with_appcontext
+def compress_static():
+    """Write gzip/brotli compressed copies of the static files."""
+    folder = static_folder()
+    for path, size, compressed_size in compress_static_folder(folder):
+        click.echo("{}: {} -> {} bytes".format(
+            os.path.relpath(path, folder), size, compressed_size))
@@ -0,0 +1,148 @@
+"""
+Compact store of the languages and their relations.
+
+Every fact is stored once. The languages are rows with a lang_id, a name
+and a year. The developers and companies are interned: each distinct name
+is kept once in a string table (see intern_strings() in columnar.py). The
+'team' and 'affiliation' tables are relations in CSR format from the rows of
+the languages to the ids in these tables. The 'succession' table is the
+graph of the lineage (see lineage.py), whose nodes are the rows of the
+languages, so the names of predecessors and successors are read from the
+name column itself.
+
+The columns of the store look like the columns of df_final (see loader.py):
+a row of the developers column is the string of the developers separated by
+'; '. store[row] returns a LanguageView with the values of one language as
+lists instead.
+"""
+
+import numpy as np
+
+from programming_languages.myflaskapp.columnar import (StringColumn,
+                                                       RelationColumn,
+                                                       csr,
+                                                       intern_strings)
+
+# separators of the joined values of a row (as in df_final, see loader.py)
+SEPARATORS = {"developers": "; ",
+              "companies": "; ",
+              "predecessors": ";",
+              "successors": ";"}
+
+
+def relation_arrays(name, lang_ids, pairs):
+    """Return the string table and the CSR arrays of a relation.
+
+    pairs are the (lang_id, name) rows of the 'team' or 'affiliation' table.
+    Rows with an unknown lang_id are skipped, like in the joins of loader.py.
+    """
+    row_of = {lang_id: row for row, lang_id in enumerate(lang_ids)}
+    pairs = [(row_of[lang_id], value) for lang_id, value in pairs
+             if lang_id in row_of]
+    strings, ids = intern_strings([value for _, value in pairs])
+    offsets, ids = csr(np.array([row for row, _ in pairs], dtype=np.int32),
+                       ids, len(lang_ids))
+    arrays = strings.arrays(name + ".strings")
+    arrays[name + ".offsets"] = offsets
+    arrays[name + ".ids"] = ids
+    return arrays
+
+
+def store_arrays(lang_ids, names, years, teams, affiliations):
+    """Return the columns and relations of the languages as arrays.
+
+    lang_ids, names and years are lists with one value per language, teams
+    and affiliations the (lang_id, name) rows of the 'team' and
+    'affiliation' tables. The 'succession' relation is stored by
+    lineage_arrays() (see lineage.py).
+    """
+    arrays = {"language.year": np.asarray(years, dtype=np.int32)}
+    arrays.update(StringColumn.from_strings(lang_ids)
+                  .arrays("language.lang_id"))
+    arrays.update(StringColumn.from_strings(names).arrays("language.name"))
+    arrays.update(relation_arrays("team", lang_ids, teams))
+    arrays.update(relation_arrays("affiliation", lang_ids, affiliations))
+    return arrays
+
+
+class LanguageStore:
+    """Columns of the languages and their relations.
+
+    arrays contains the arrays created by store_arrays() and
+    lineage_arrays().
+    """
+
+    def __init__(self, arrays):
+        self.lang_ids = StringColumn.from_arrays(arrays, "language.lang_id")
+        self.names = StringColumn.from_arrays(arrays, "language.name")
+        self.years = arrays["language.year"]
+        self.developers = RelationColumn.from_arrays(
+            arrays, "team", StringColumn.from_arrays(arrays, "team.strings"),
+            SEPARATORS["developers"])
+        self.companies = RelationColumn.from_arrays(
+            arrays, "affiliation",
+            StringColumn.from_arrays(arrays, "affiliation.strings"),
+            SEPARATORS["companies"])
+        # the edges of the lineage graph lead from a row to the rows of its
+        # predecessors ("up") and successors ("down")
+        self.predecessors = RelationColumn(arrays["lineage.up.offsets"],
+                                           arrays["lineage.up.targets"],
+                                           self.names,
+                                           SEPARATORS["predecessors"])
+        self.successors = RelationColumn(arrays["lineage.down.offsets"],
+                                         arrays["lineage.down.targets"],
+                                         self.names,
+                                         SEPARATORS["successors"])
+
+    def __len__(self):
+        return len(self.years)
+
+    def __getitem__(self, row):
+        if not 0 <= row < len(self):
+            raise IndexError("LanguageStore index out of range")
+        return LanguageView(self, row)
+
+
+class LanguageView:
+    """One language of a LanguageStore.
+
+    The view only holds the store and the row; the values are read from the
+    columns when they are accessed.
+    """
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def lang_id(self):
+        return self.store.lang_ids[self.row]
+
+    @property
+    def name(self):
+        return self.store.names[self.row]
+
+    @property
+    def year(self):
+        return int(self.store.years[self.row])
+
+    @property
+    def developers(self):
+        return self.store.developers.values(self.row)
+
+    @property
+    def companies(self):
+        return self.store.companies.values(self.row)
+
+    @property
+    def predecessors(self):
+        return self.store.predecessors.values(self.row)
+
+    @property
+    def successors(self):
+        return self.store.successors.values(self.row)
+
+    def __repr__(self):
+        return "<LanguageView {!r} ({})>".format(self.name, self.year)
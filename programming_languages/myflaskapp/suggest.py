@@ -0,0 +1,133 @@
+"""
+Autocompletion of language names for the '/relationships' page.
+
+The names are kept in a list that is sorted by their normalized form, so that
+all names that start with the typed text can be found with a binary search.
+If there are not enough of those, the list of suggestions is filled up with
+names that share the most trigrams (substrings of three characters) with the
+typed text. This also finds names that contain the text somewhere in the
+middle or that differ from it by a typo.
+
+The sorted names and the posting lists of the trigrams are stored as arrays
+(see columnar.py), so that the index can be memory-mapped from a snapshot
+file. The posting lists are kept in CSR format: the positions of the names
+with the i-th trigram are positions[offsets[i]:offsets[i+1]].
+"""
+
+from bisect import bisect_left
+
+import numpy as np
+
+from programming_languages.myflaskapp.columnar import StringColumn
+from programming_languages.myflaskapp.lookup import normalize_name
+
+# minimal share of the trigrams of the typed text that a name has to contain
+# to be suggested
+MIN_SIMILARITY = 0.3
+
+
+def trigrams(text):
+    """Return the set of trigrams of the text (padded with spaces)."""
+    text = " " + text + " "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def suggest_arrays(names):
+    """Return the sorted names and the trigram posting lists as arrays."""
+    entries = sorted((normalize_name(name), name, row)
+                     for row, name in enumerate(names))
+    keys = [key for key, _, _ in entries]
+    arrays = StringColumn.from_strings(keys).arrays("suggest.keys")
+    # row of each name in the names column
+    arrays["suggest.rows"] = np.array([row for _, _, row in entries],
+                                      dtype=np.int32)
+    arrays["suggest.lengths"] = np.array([len(key) for key in keys],
+                                         dtype=np.int32)
+
+    # posting list of the positions of all names for each trigram
+    postings = {}
+    for position, key in enumerate(keys):
+        for trigram in trigrams(key):
+            postings.setdefault(trigram, []).append(position)
+    trigram_keys = sorted(postings)
+    arrays.update(StringColumn.from_strings(trigram_keys)
+                  .arrays("suggest.trigrams"))
+    offsets = np.zeros(len(trigram_keys) + 1, dtype=np.int64)
+    np.cumsum([len(postings[trigram]) for trigram in trigram_keys],
+              out=offsets[1:])
+    arrays["suggest.offsets"] = offsets
+    arrays["suggest.positions"] = np.array(
+        [position for trigram in trigram_keys
+         for position in postings[trigram]], dtype=np.int32)
+    return arrays
+
+
+class SuggestIndex:
+    """Prefix and trigram index over the language names.
+
+    names is the sequence of the language names and arrays contains the
+    arrays created by suggest_arrays(names).
+    """
+
+    def __init__(self, names, arrays):
+        self.names = names
+        self.keys = StringColumn.from_arrays(arrays, "suggest.keys")
+        self.rows = arrays["suggest.rows"]
+        self.lengths = arrays["suggest.lengths"]
+        self.trigrams = StringColumn.from_arrays(arrays, "suggest.trigrams")
+        self.offsets = arrays["suggest.offsets"]
+        self.positions = arrays["suggest.positions"]
+
+    def postings(self, trigram):
+        """Return the positions of the names with trigram or None."""
+        i = bisect_left(self.trigrams, trigram)
+        if i == len(self.trigrams) or self.trigrams[i] != trigram:
+            return None
+        return self.positions[self.offsets[i]:self.offsets[i + 1]]
+
+    def prefix_matches(self, key, limit):
+        """Return the positions of up to limit names that start with key."""
+        positions = []
+        position = bisect_left(self.keys, key)
+        while (position < len(self.keys) and len(positions) < limit and
+               self.keys[position].startswith(key)):
+            positions.append(position)
+            position += 1
+        return positions
+
+    def fuzzy_matches(self, key, limit):
+        """Return the positions of up to limit names similar to key.
+
+        The names are ranked by the share of trigrams of key that they
+        contain, and shorter names come first among equally similar ones.
+        """
+        key_trigrams = trigrams(key)
+        postings = [self.postings(trigram) for trigram in key_trigrams]
+        postings = [positions for positions in postings
+                    if positions is not None]
+        if not postings:
+            return []
+        # number of shared trigrams for each name
+        counts = np.bincount(np.concatenate(postings),
+                             minlength=len(self.keys))
+        candidates = np.flatnonzero(
+            counts >= MIN_SIMILARITY * len(key_trigrams))
+        # np.lexsort sorts by the last key first
+        order = np.lexsort((candidates, self.lengths[candidates],
+                            -counts[candidates]))
+        return candidates[order[:limit]].tolist()
+
+    def suggest(self, text, limit=10):
+        """Return up to limit language names that match the typed text."""
+        key = normalize_name(text).strip()
+        if not key:
+            return []
+        positions = self.prefix_matches(key, limit)
+        # the trigrams of very short texts are not selective enough
+        if len(positions) < limit and len(key) >= 3:
+            for position in self.fuzzy_matches(key, limit):
+                if position not in positions:
+                    positions.append(position)
+                    if len(positions) == limit:
+                        break
+        return [self.names[self.rows[position]] for position in positions]
@@ -0,0 +1,124 @@
+"""
+Server-side processing for the DataTables table on the '/table' page.
+
+Instead of sending the whole table as html to the browser, the DataTables
+plug-in requests only the rows of the currently displayed page.
+see: https://datatables.net/manual/server-side
+
+Everything that does not depend on the request is computed once when the
+data is loaded: a lower case search text per row and the row orders for
+sorting by each column in both directions. They are stored as arrays (see
+columnar.py), so that the index can be memory-mapped from a snapshot file.
+Only the cells of the requested page are html-escaped per request.
+"""
+
+import numpy as np
+from markupsafe import escape
+
+from programming_languages.myflaskapp.columnar import StringColumn
+
+# columns of the table in the order in which they are displayed
+TABLE_COLUMNS = ["Year", "Language", "Developers", "Companies",
+                 "Predecessors", "Successors"]
+
+
+def table_arrays(df_final):
+    """Return the search texts and sort orders of the table as arrays.
+
+    The rows are referred to by their position in df_final.
+    """
+    df = df_final[TABLE_COLUMNS].reset_index(drop=True)
+    # default order of the table
+    default = df.sort_values(["Year", "Language"]).index.to_numpy()
+
+    # lower case text of each row for the global search; the rows are
+    # separated by newlines in the data array of the column, so that a match
+    # never spans two rows
+    texts = ["\t".join(str(value) for value in row).lower()
+             .replace("\n", " ") + "\n"
+             for row in df.fillna("-").itertuples(index=False)]
+    arrays = StringColumn.from_strings(texts).arrays("table.search")
+
+    # row orders for each column; the stable sort keeps the default order
+    # for rows with equal values
+    df = df.iloc[default].reset_index(drop=True)
+    for i, column in enumerate(TABLE_COLUMNS):
+        if column == "Year":
+            values = df[column]
+        else:
+            values = df[column].fillna("").str.lower()
+        for direction, ascending in (("asc", True), ("desc", False)):
+            order = values.sort_values(ascending=ascending,
+                                       kind="stable").index.to_numpy()
+            arrays["table.order.{}.{}".format(i, direction)] = \
+                default[order].astype(np.int32)
+    return arrays
+
+
+class DataTablesIndex:
+    """Precomputed search texts and sort orders of the table.
+
+    columns are the sequences with the values of the TABLE_COLUMNS (missing
+    values as empty strings) and arrays contains the arrays created by
+    table_arrays().
+    """
+
+    def __init__(self, columns, arrays):
+        self.columns = columns
+        self.search_texts = StringColumn.from_arrays(arrays, "table.search")
+        self.orders = {}
+        for i in range(len(TABLE_COLUMNS)):
+            for direction in ("asc", "desc"):
+                self.orders[(i, direction)] = \
+                    arrays["table.order.{}.{}".format(i, direction)]
+
+    def row(self, position):
+        """Return a row as it is sent to the browser.
+
+        DataTables inserts the cell content as html, so it is escaped here.
+        """
+        years = self.columns[0]
+        return [int(years[position])] + [
+            str(escape(column[position])) if column[position] else "-"
+            for column in self.columns[1:]]
+
+    def search(self, text):
+        """Return a boolean array that marks the rows which contain text."""
+        mask = np.zeros(len(self.search_texts), dtype=bool)
+        needle = np.frombuffer(text.encode(), dtype=np.uint8)
+        data = self.search_texts.data
+        if "\n" in text or len(needle) > len(data):
+            return mask
+        # positions where the needle starts: compare one byte after the
+        # other, starting with all positions of the first byte
+        positions = np.flatnonzero(data[:len(data) - len(needle) + 1] ==
+                                   needle[0])
+        for i in range(1, len(needle)):
+            positions = positions[data[positions + i] == needle[i]]
+        rows = np.searchsorted(self.search_texts.offsets, positions,
+                               side="right") - 1
+        mask[rows] = True
+        return mask
+
+    def query(self, draw, start, length, search, order_column, order_dir):
+        """Return the response to a DataTables server-side request."""
+        if (order_column, order_dir) in self.orders:
+            order = self.orders[(order_column, order_dir)]
+        else:
+            order = self.orders[(0, "asc")]
+
+        search = search.strip().lower()
+        if search:
+            order = order[self.search(search)[order]]
+
+        # a length of -1 means "show all entries"
+        start = max(start, 0)
+        if length < 0:
+            positions = order[start:]
+        else:
+            positions = order[start:start + length]
+
+        return {"draw": draw,
+                "recordsTotal": len(self.search_texts),
+                "recordsFiltered": len(order),
+                "data": [self.row(position) for position in positions]}
@@ -0,0 +1,332 @@
+"""
+Routes (i.e. websites) of the Flask application.
+
+All routes are defined on the blueprint 'main', which is registered by
+create_app() in __init__.py. The data is taken from the current snapshot
+(see reloader.py).
+"""
+
+from flask import Blueprint, current_app, request, jsonify, abort
+from markupsafe import escape
+
+from programming_languages.myflaskapp.table_api import TABLE_COLUMNS
+from programming_languages.myflaskapp.lookup import normalize_name
+from programming_languages.myflaskapp.lineage import DIRECTIONS
+from programming_languages.myflaskapp.conditional import conditional_page
+from programming_languages.myflaskapp.export import (EXPORT_COLUMNS,
+                                                     EXPORT_FORMATS,
+                                                     export_chunks,
+                                                     export_columns,
+                                                     parquet_available,
+                                                     select_rows)
+from programming_languages.myflaskapp.metrics import (REGISTRY,
+                                                      render_template)
+from programming_languages.myflaskapp.reloader import (current_snapshot,
+                                                       snapshot_version)
+
+bp = Blueprint("main", __name__)
+
+
+def page_cache():
+    """Return the cache of rendered pages of the app (see conditional.py)."""
+    return current_app.extensions["page_cache"]
+
+
+def year_arguments():
+    """Return the 'year_from' and 'year_to' URL parameters as dict.
+
+    Missing parameters are None; values that are not integers are rejected
+    with the status code 400.
+    """
+    years = {}
+    for name in ("year_from", "year_to"):
+        years[name] = request.args.get(name, type=int)
+        if name in request.args and years[name] is None:
+            abort(400)
+    return years
+
+
+def no_data():
+    """Return the data version of pages that do not show any data."""
+    return None
+
+
+# About page = serves also as the main landing page
+@bp.route('/')
+@bp.route('/about')
+@conditional_page(no_data, page_cache)
+def about():
+    """Create About page with some background information on the app."""
+    return render_template('/about.html')
+
+
+# Page with overview table of all programming languages
+@bp.route('/table')
+@conditional_page(no_data, page_cache)
+def table():
+    """Create page with a table showing all programming languages in the DB.
+
+    The rows of the table are loaded by DataTables from '/api/languages'.
+    """
+    return render_template('/table.html',
+                           columns=TABLE_COLUMNS)
+
+
+# Rows of the overview table in the format of DataTables' server-side mode
+# see: https://datatables.net/manual/server-side
+@bp.route('/api/languages')
+def api_languages():
+    """Return one page of the overview table as JSON."""
+    return jsonify(current_snapshot().table_index.query(
+        draw=request.args.get('draw', 0, type=int),
+        start=request.args.get('start', 0, type=int),
+        length=request.args.get('length', 10, type=int),
+        search=request.args.get('search[value]', ''),
+        order_column=request.args.get('order[0][column]', 0, type=int),
+        order_dir=request.args.get('order[0][dir]', 'asc')))
+
+
+# Page with relationships between programming languages
+@bp.route('/relationships', methods=['GET', 'POST'])
+@conditional_page(snapshot_version, page_cache)
+def relationships():
+    """Create page showing the relationship between programming languages."""
+
+    # set default values (will be displayed if nothing is selected)
+    language_name = "-"
+    year = "-"
+    developers = "-"
+    companies = "-"
+    predecessors = "-"
+    successors = "-"
+
+    # if page is called with a URL parameter:
+    if "language" in request.args:
+        selected_language = request.args.get('language')
+        record = current_snapshot().language_lookup.get(
+            normalize_name(selected_language))
+
+        if record is not None:
+            (language_name, year, developers, companies,
+             predecessors, successors) = record
+        else:
+            language_name = ('<span style="color:red">"' +
+                             str(escape(selected_language)) +
+                             '" does not exist in the database.</span>')
+
+    return render_template('/relationships.html',
+                           language_name=language_name,
+                           year=year,
+                           developers=developers,
+                           companies=companies,
+                           predecessors=predecessors,
+                           successors=successors)
+
+
+# Autocompletion of language names for the input field on '/relationships'
+@bp.route('/api/languages/suggest')
+def api_languages_suggest():
+    """Return the names of the languages that match the typed text."""
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    return jsonify(current_snapshot().suggest_index.suggest(
+        request.args.get('q', ''), limit))
+
+
+# Ancestors ("up") or descendants ("down") of a language in the graph of
+# influences, or the shortest chain of influence to another language ("to")
+@bp.route('/api/lineage/<path:language>')
+def api_lineage(language):
+    """Return the lineage of a language as JSON."""
+    direction = request.args.get('direction', 'up')
+    depth = request.args.get('depth', type=int)
+    # values that are not integers are rejected like in year_arguments()
+    if (direction not in DIRECTIONS or
+            ('depth' in request.args and (depth is None or depth < 1))):
+        abort(400)
+    lineage_graph = current_snapshot().lineage_graph
+    node = lineage_graph.node(language)
+    if node is None:
+        abort(404)
+
+    if "to" in request.args:
+        target = lineage_graph.node(request.args.get('to'))
+        if target is None:
+            abort(404)
+        path = lineage_graph.shortest_path(node, target, direction)
+        return jsonify({"language": lineage_graph.names[node],
+                        "to": lineage_graph.names[target],
+                        "direction": direction,
+                        "path": (None if path is None else
+                                 [lineage_graph.names[n] for n in path])})
+
+    reached = lineage_graph.traverse(node, direction, depth)
+    return jsonify({"language": lineage_graph.names[node],
+                    "direction": direction,
+                    "depth": depth,
+                    "languages": [{"name": lineage_graph.names[n],
+                                   "year": int(lineage_graph.years[n]),
+                                   "distance": distance}
+                                  for n, distance in reached]})
+
+
+# Full-text search over the names of the languages, developers and companies
+# (see search.py), e.g. '/api/search?q=bell labs' or '?q=pascal OR modula*'
+@bp.route('/api/search')
+def api_search():
+    """Return the ranked languages that match the query as JSON."""
+    query = request.args.get('q', '')
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    result = current_snapshot().search_index.search(query, limit, offset)
+    result.update({"query": query, "limit": limit, "offset": offset})
+    return jsonify(result)
+
+
+# Languages filtered by developer, company, years and lineage, queried from
+# the database (see query_api.py)
+@bp.route('/api/query')
+def api_query():
+    """Return the languages that match all given filters as JSON."""
+    # SQLAlchemy is only imported on the first query
+    from programming_languages.myflaskapp.query_api import (MAX_LIMIT,
+                                                            run_query)
+
+    values = {"developer": request.args.get('developer'),
+              "company": request.args.get('company'),
+              "lineage": request.args.get('lineage')}
+    values.update(year_arguments())
+    direction = request.args.get('direction', 'down')
+    if direction not in DIRECTIONS:
+        abort(400)
+    limit = min(max(request.args.get('limit', 100, type=int), 1), MAX_LIMIT)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+
+    session = current_app.extensions["database"].session
+    return jsonify({"languages": run_query(session, values, direction,
+                                           limit, offset),
+                    "limit": limit,
+                    "offset": offset})
+
+
+# Download of the joined data of all languages (the rows of the '/table'
+# page), streamed in chunks (see export.py)
+@bp.route('/export/languages.<format>')
+def export_languages(format):
+    """Return the languages as CSV, NDJSON or Parquet file.
+
+    The URL parameter 'columns' selects the columns (comma separated, e.g.
+    'columns=language,year'), 'year_from' and 'year_to' the range of years.
+    """
+    if format not in EXPORT_FORMATS:
+        abort(404)
+    if format == "parquet" and not parquet_available():
+        abort(501)
+    years = year_arguments()
+    names = list(EXPORT_COLUMNS)
+    if 'columns' in request.args:
+        names = [name.strip().lower()
+                 for name in request.args.get('columns').split(",")]
+        if any(name not in EXPORT_COLUMNS for name in names):
+            abort(400)
+        names = list(dict.fromkeys(names))
+
+    # the generator keeps using this snapshot even if a new one is loaded
+    # while the response is sent
+    snapshot = current_snapshot()
+    positions = select_rows(snapshot.years, years["year_from"],
+                            years["year_to"])
+    # Parquet files are compressed already
+    use_gzip = format != "parquet" and bool(request.accept_encodings["gzip"])
+    response = current_app.response_class(
+        export_chunks(format, export_columns(snapshot), names, positions,
+                      gzip=use_gzip),
+        mimetype=EXPORT_FORMATS[format])
+    if use_gzip:
+        response.content_encoding = "gzip"
+    response.vary.add("Accept-Encoding")
+    response.headers["Content-Disposition"] = \
+        "attachment; filename=languages." + format
+    return response
+
+
+# Metrics of the requests, caches and timing spans in the Prometheus text
+# format (see metrics.py)
+@bp.route('/metrics')
+def metrics():
+    """Return all metrics of this process for Prometheus."""
+    reloader = current_app.extensions["snapshot_reloader"]
+    stats = reloader.metrics.as_dict()
+    extra = [
+        ("snapshot_reloads_total", "counter",
+         "Number of successful reloads of the data.", stats["reloads"]),
+        ("snapshot_failed_reloads_total", "counter",
+         "Number of reloads that failed.", stats["failed_reloads"]),
+        ("snapshot_last_reload_seconds", "gauge",
+         "Duration of the last reload.", stats["last_reload_seconds"]),
+        ("page_cache_bytes", "gauge",
+         "Size of the rendered pages in the page cache.", page_cache().size)]
+    return current_app.response_class(
+        REGISTRY.render(extra),
+        content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# Metrics of the data reloads (see snapshot.py)
+@bp.route('/metrics/reload')
+def metrics_reload():
+    """Return the reload durations and request latencies as JSON."""
+    reloader = current_app.extensions["snapshot_reloader"]
+    return jsonify(reloader.metrics.as_dict())
+
+
+# Page with charts
+@bp.route('/charts')
+@conditional_page(no_data, page_cache)
+def charts():
+    """Create page with interactive and static charts.
+
+    The charts themselves are loaded by the browser from the routes below.
+    """
+    return render_template('/charts.html')
+
+
+def send_chart(name, mimetype):
+    """Return a response with a cached chart.
+
+    The chart is sent precompressed if the browser accepts the encoding. The
+    ETag allows the browser to revalidate its cached copy of the chart.
+    """
+    try:
+        variants, etag = current_snapshot().chart_cache.get(name)
+    except KeyError:
+        abort(404)
+    encoding = "identity"
+    for accepted in ("br", "gzip"):
+        if accepted in variants and request.accept_encodings[accepted]:
+            encoding = accepted
+            break
+    response = current_app.response_class(variants[encoding],
+                                          mimetype=mimetype)
+    if encoding != "identity":
+        response.content_encoding = encoding
+        # each encoding is a different representation with its own strong ETag
+        etag = etag + "-" + encoding
+    response.vary.add("Accept-Encoding")
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+# Interactive chart (plotly figure as JSON, rendered by plotly javascript)
+@bp.route('/api/charts/new-languages.json')
+def chart_new_languages():
+    """Return the plotly figure of the new languages per year."""
+    return send_chart("new-languages", "application/json")
+
+
+# Static charts (rendered by matplotlib)
+@bp.route('/charts/<name>.svg')
+def chart_svg(name):
+    """Return a static chart as SVG image."""
+    if name == "new-languages":
+        abort(404)
+    return send_chart(name, "image/svg+xml")